@@ -0,0 +1,149 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(
+            first_name="Лев", last_name="Толстой", username="author"
+        )
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="group",
+            title="Группа"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {number}"
+            )
+            for number in range(12)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            author=cls.reader, post=cls.post, text="Комментарий"
+        )
+        Follow.objects.create(author=cls.author, user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_listed_by_page(self):
+        urls = (
+            reverse("api:index"),
+            reverse("api:group_list", kwargs={"slug": self.group.slug}),
+            reverse("api:profile", kwargs={"username": self.author}),
+            reverse("api:follow_index"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.reader_client.get(url).json()
+                second = self.reader_client.get(first["next"]).json()
+
+                self.assertEqual(len(first["results"]), 10)
+                self.assertEqual(first["results"][0]["id"], self.post.id)
+                self.assertEqual(
+                    first["results"][0]["author"],
+                    {"name": "Лев Толстой", "username": "author"}
+                )
+                self.assertIsNone(first["previous"])
+                self.assertEqual(len(second["results"]), 2)
+                self.assertIsNone(second["next"])
+
+    def test_post_detail_with_comments(self):
+        data = self.client.get(
+            reverse("api:post_detail", kwargs={"post_id": self.post.id})
+        ).json()
+
+        self.assertEqual(data["text"], self.post.text)
+        self.assertEqual(data["group"]["slug"], self.group.slug)
+        self.assertEqual(
+            [comment["text"] for comment in data["comments"]["results"]],
+            ["Комментарий"]
+        )
+
+    def test_unchanged_feed_not_modified(self):
+        url = reverse("api:index")
+        response = self.client.get(url)
+
+        # The ETag of the index only needs the cached feed version.
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b"")
+
+    def test_changed_feeds_sent_again(self):
+        changes = {
+            reverse("api:index"): lambda: Post.objects.create(
+                author=self.author, text="Новый пост"
+            ),
+            reverse("api:post_detail", kwargs={"post_id": self.post.id}): (
+                lambda: Comment.objects.create(
+                    author=self.reader, post=self.post, text="Новый"
+                )
+            ),
+            reverse("api:profile", kwargs={"username": self.author}): (
+                lambda: User.objects.filter(pk=self.author.pk).first().save()
+            ),
+            reverse("api:follow_index"): lambda: Follow.objects.filter(
+                user=self.reader
+            ).delete(),
+        }
+        for url, change in changes.items():
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)["ETag"]
+                change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_edited_post_not_dated_unmodified(self):
+        urls = (
+            reverse("api:index"),
+            reverse("api:group_list", kwargs={"slug": self.group.slug}),
+            reverse("api:profile", kwargs={"username": self.author}),
+        )
+        since = http_date()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Исправленный пост"
+        post.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, "Исправленный пост")
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(reverse("api:follow_index"))
+
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_missing_objects_not_found(self):
+        urls = (
+            reverse("api:group_list", kwargs={"slug": "missing"}),
+            reverse("api:post_detail", kwargs={"post_id": 0}),
+            reverse("api:post_comments", kwargs={"post_id": 0}),
+            reverse("api:profile", kwargs={"username": "missing"}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,143 @@
+"""Read-only JSON API of the feeds.
+
+Responses are compact JSON with cursor pagination: every list has
+"results" and the "next" and "previous" URLs, null at the ends. The
+views are wrapped in condition() with the validators of
+posts.conditions, so clients revalidating an unchanged page get 304
+without the list query running.
+"""
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_safe
+from posts.conditions import (
+    conditional, follow_state, group_state, index_state, post_state,
+    profile_state
+)
+from posts.models import Comment, Group, Post, User
+from posts.timeline import get_timeline_page
+from posts.utils import get_page_obj
+
+JSON_PARAMS = {"ensure_ascii": False, "separators": (",", ":")}
+
+
+def json_response(data, status=HTTPStatus.OK):
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS, status=status)
+
+
+def user_data(user):
+    return {"name": user.get_full_name(), "username": user.username}
+
+
+def post_data(post):
+    return {
+        "author": user_data(post.author),
+        "group": post.group and {
+            "slug": post.group.slug,
+            "title": post.group.title,
+        },
+        "id": post.pk,
+        "image": post.image.url if post.image else None,
+        "pub_date": post.pub_date,
+        "text": post.text,
+        "thumbnail": post.thumbnail.url if post.thumbnail else None,
+        "url": reverse("api:post_detail", kwargs={"post_id": post.pk}),
+        "version": post.version,
+    }
+
+
+def comment_data(comment):
+    return {
+        "author": user_data(comment.author),
+        "id": comment.pk,
+        "pub_date": comment.pub_date,
+        "text": comment.text,
+    }
+
+
+def cursor_url(request, path, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query["cursor"] = cursor
+    return f"{path}?{query.urlencode()}"
+
+
+def page_data(request, page, serialize, path=None):
+    path = path or request.path
+    return {
+        "next": cursor_url(request, path, page.next_cursor),
+        "previous": cursor_url(request, path, page.previous_cursor),
+        "results": [serialize(obj) for obj in page],
+    }
+
+
+def get_comments_page(request, post_id):
+    return get_page_obj(
+        request,
+        Comment.objects.for_feed().filter(post_id=post_id),
+        settings.COMMENTS_PER_PAGE
+    )
+
+
+@require_safe
+@conditional(follow_state)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response(
+            {"detail": "Authentication required"}, HTTPStatus.UNAUTHORIZED
+        )
+    page_obj = get_timeline_page(request, Post.objects.for_feed())
+    response = json_response(page_data(request, page_obj, post_data))
+    response["Cache-Control"] = "private"
+    return response
+
+
+@require_safe
+@conditional(group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page_obj = get_page_obj(request, group.posts.for_feed())
+    return json_response(page_data(request, page_obj, post_data))
+
+
+@require_safe
+@conditional(index_state)
+def index(request):
+    page_obj = get_page_obj(request, Post.objects.for_feed())
+    return json_response(page_data(request, page_obj, post_data))
+
+
+@require_safe
+@conditional(post_state)
+def post_comments(request, post_id):
+    get_object_or_404(Post, pk=post_id)
+    page_obj = get_comments_page(request, post_id)
+    return json_response(page_data(request, page_obj, comment_data))
+
+
+@require_safe
+@conditional(post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    data = post_data(post)
+    data["comments"] = page_data(
+        request,
+        get_comments_page(request, post_id),
+        comment_data,
+        reverse("api:post_comments", kwargs={"post_id": post_id})
+    )
+    return json_response(data)
+
+
+@require_safe
+@conditional(profile_state)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = get_page_obj(request, author.posts.for_feed())
+    data = page_data(request, page_obj, post_data)
+    data["author"] = user_data(author)
+    return json_response(data)
@@ -0,0 +1,101 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+from .metrics import record_cache
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _lock_file(lock_key):
+    """Path of the lock file when the default cache keeps its entries in
+    files, whose add() reads and writes the entry non-atomically"""
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if not isinstance(backend, FileBasedCache):
+        return None
+    backend._createdir()
+    # Unlike .djcache files, lock files are never culled or cleared.
+    return os.path.splitext(backend._key_to_file(lock_key))[0] + ".lock"
+
+
+def _create(path):
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def acquire(lock_key, lock_timeout):
+    """Take the lock in one worker at a time, it is released by
+    release() or expires after lock_timeout. The file cache uses an
+    exclusively created lock file, other backends an atomic cache.add."""
+    path = _lock_file(lock_key)
+    if path is None:
+        return cache.add(lock_key, True, lock_timeout)
+    if _create(path):
+        return True
+    try:
+        if time.time() - os.path.getmtime(path) < lock_timeout:
+            return False
+        # Left behind by a worker that died while holding the lock.
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return _create(path)
+
+
+def release(lock_key):
+    path = _lock_file(lock_key)
+    if path is None:
+        cache.delete(lock_key)
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_or_build(key, build, timeout, lock_timeout=None):
+    """Return the value cached under key, building it with build() in one
+    worker at a time.
+
+    The value is stored with a soft expiry after timeout and kept for
+    another lock_timeout. Once the soft expiry passes, the worker that
+    takes the lock rebuilds the value while the others keep serving the
+    old one. When there is no value at all the others wait for the lock
+    holder, and build it themselves only if it does not finish in time.
+    """
+    lock_timeout = lock_timeout or settings.CACHE_LOCK_TIMEOUT
+    lock_key = f"lock:{key}"
+
+    entry = cache.get(key)
+    if entry is not None and time.time() < entry[1]:
+        record_cache(hits=1)
+        return entry[0]
+
+    locked = acquire(lock_key, lock_timeout)
+    if not locked:
+        if entry is not None:
+            record_cache(hits=1)
+            return entry[0]
+        deadline = time.time() + lock_timeout
+        while not locked and time.time() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                record_cache(hits=1)
+                return entry[0]
+            locked = acquire(lock_key, lock_timeout)
+
+    record_cache(misses=1)
+    try:
+        value = build()
+        cache.set(key, (value, time.time() + timeout), timeout + lock_timeout)
+    finally:
+        if locked:
+            release(lock_key)
+    return value
@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+ROWS = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long readers wait for a concurrent writer on a "
+        "scratch SQLite database with the rollback journal and with "
+        "SQLITE_PRAGMAS. Reads that took at least half of --write-time "
+        "are counted as blocked"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--readers",
+            default=4,
+            type=int,
+            help="Number of reader threads"
+        )
+        parser.add_argument(
+            "--duration",
+            default=3.0,
+            type=float,
+            help="Seconds to run each configuration"
+        )
+        parser.add_argument(
+            "--write-time",
+            default=0.05,
+            type=float,
+            help="Seconds the writer holds its lock in every transaction"
+        )
+
+    def handle(self, *args, readers, duration, write_time, **options):
+        configurations = (
+            ("rollback journal", {
+                "journal_mode": "DELETE",
+                "busy_timeout": settings.SQLITE_PRAGMAS["busy_timeout"],
+            }),
+            ("SQLITE_PRAGMAS", settings.SQLITE_PRAGMAS),
+        )
+        self.stdout.write(
+            f"{'configuration':<20}{'reads':>10}{'errors':>8}"
+            f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'blocked':>9}"
+            f"{'writes':>8}"
+        )
+        for name, pragmas in configurations:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.run(
+                    os.path.join(directory, "benchmark.sqlite3"),
+                    pragmas,
+                    readers,
+                    duration,
+                    write_time
+                )
+            self.stdout.write(f"{name:<20}" + "".join(
+                f"{value:>{width}}" for value, width in zip(
+                    result, (10, 8, 10, 10, 10, 9, 8)
+                )
+            ))
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def run(self, path, pragmas, readers, duration, write_time):
+        connection = self.connect(path, pragmas)
+        connection.execute(
+            "CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO post (text) VALUES (?)",
+            ((f"post {number}",) for number in range(ROWS))
+        )
+        connection.close()
+
+        stop = threading.Event()
+        latencies = []
+        errors = []
+        writes = []
+
+        def read():
+            connection = self.connect(path, pragmas)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute(
+                        "SELECT id, text FROM post ORDER BY id DESC LIMIT 10"
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    errors.append(1)
+                else:
+                    latencies.append(time.perf_counter() - started)
+            connection.close()
+
+        def write():
+            # An exclusive transaction holds the lock a commit of the
+            # rollback journal needs, WAL lets readers through anyway.
+            connection = self.connect(path, pragmas)
+            while not stop.is_set():
+                connection.execute("BEGIN EXCLUSIVE")
+                connection.execute(
+                    "INSERT INTO post (text) VALUES (?)", ("comment",)
+                )
+                time.sleep(write_time)
+                connection.execute("COMMIT")
+                writes.append(1)
+                time.sleep(write_time)
+            connection.close()
+
+        threads = [threading.Thread(target=write)] + [
+            threading.Thread(target=read) for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        milliseconds = sorted(latency * 1000 for latency in latencies)
+        percentiles = statistics.quantiles(milliseconds, n=100)
+        return (
+            len(milliseconds),
+            len(errors),
+            f"{percentiles[49]:.2f}",
+            f"{percentiles[98]:.2f}",
+            f"{milliseconds[-1]:.2f}",
+            sum(latency >= write_time / 2 for latency in latencies),
+            len(writes),
+        )
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import post_replica_sync, pre_replica_sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the default SQLite database over the files of "
+        "DATABASE_REPLICAS, once or every --interval seconds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep copying with this pause in seconds between copies"
+        )
+
+    def handle(self, *args, interval=None, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("DATABASE_REPLICAS is empty")
+        for alias in ("default", *settings.DATABASE_REPLICAS):
+            if connections[alias].vendor != "sqlite":
+                raise CommandError(
+                    f"{alias} is not SQLite, use the database's own "
+                    "replication instead"
+                )
+
+        while True:
+            pre_replica_sync.send(sender=self.__class__)
+            for alias in settings.DATABASE_REPLICAS:
+                self.copy(
+                    connections["default"].settings_dict["NAME"],
+                    connections[alias].settings_dict["NAME"]
+                )
+            post_replica_sync.send(sender=self.__class__)
+            self.stdout.write(self.style.SUCCESS(
+                f"Copied the database to {len(settings.DATABASE_REPLICAS)} "
+                "replicas"
+            ))
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def copy(self, source_name, replica_name):
+        """Take a consistent snapshot with the SQLite backup API and swap
+        it in atomically, so readers of the replica never see a partly
+        written file."""
+        temporary_name = f"{replica_name}.tmp"
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(temporary_name)
+        try:
+            source.backup(target)
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+            source.close()
+        os.replace(temporary_name, replica_name)
@@ -0,0 +1,155 @@
+"""Serving of the files uploaded to MEDIA_ROOT.
+
+file_response answers conditional requests from the file's mtime and
+size and a single byte range with 206 Partial Content. The file goes
+out as a FileResponse, which the WSGI server sends with sendfile()
+through wsgi.file_wrapper. With MEDIA_ACCEL set, accel_response only
+names the file in an X-Accel-Redirect (nginx) or X-Sendfile (Apache,
+lighttpd) header and the front proxy sends it, ranges included.
+"""
+import mimetypes
+import os
+import re
+import stat
+from http import HTTPStatus
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import (
+    ImproperlyConfigured, SuspiciousFileOperation
+)
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+X_ACCEL_REDIRECT = "x-accel-redirect"
+X_SENDFILE = "x-sendfile"
+
+
+class UnsatisfiableRange(ValueError):
+    pass
+
+
+class RangeFile:
+    """Read at most length bytes of file from offset. fileno() is kept,
+    so servers send the range with sendfile() limited to the
+    Content-Length."""
+
+    def __init__(self, file, offset, length):
+        file.seek(offset)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def get_media_path(name):
+    """Return the path of an uploaded file, or raise Http404"""
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        mode = os.stat(path).st_mode
+    except (OSError, SuspiciousFileOperation, ValueError):
+        raise Http404(name)
+    if not stat.S_ISREG(mode):
+        raise Http404(name)
+    return path
+
+
+def parse_range(header, size):
+    """Return the first and last byte of a single range header, None for
+    headers that are ignored like multiple ranges, or raise
+    UnsatisfiableRange"""
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        raise UnsatisfiableRange(header)
+    return first, last
+
+
+def file_response(request, path):
+    file_stat = os.stat(path)
+    size = file_stat.st_size
+    etag = f'"{file_stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(file_stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        byte_range = None
+        header = request.META.get("HTTP_RANGE")
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if header and (
+            if_range is None
+            or if_range == etag
+            or parse_http_date_safe(if_range) == last_modified
+        ):
+            try:
+                byte_range = parse_range(header, size)
+            except UnsatisfiableRange:
+                response = HttpResponse(
+                    status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+                )
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        file = open(path, "rb")
+        if byte_range is None:
+            response = FileResponse(file)
+        else:
+            first, last = byte_range
+            response = FileResponse(
+                RangeFile(file, first, last - first + 1),
+                status=HTTPStatus.PARTIAL_CONTENT
+            )
+            response["Content-Length"] = last - first + 1
+            response["Content-Range"] = f"bytes {first}-{last}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = f"public, max-age={settings.MEDIA_MAX_AGE}"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def accel_response(name, path):
+    content_type = mimetypes.guess_type(path)[0]
+    response = HttpResponse(
+        content_type=content_type or "application/octet-stream"
+    )
+    if settings.MEDIA_ACCEL == X_ACCEL_REDIRECT:
+        response["X-Accel-Redirect"] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(name)
+        )
+    elif settings.MEDIA_ACCEL == X_SENDFILE:
+        response["X-Sendfile"] = path
+    else:
+        raise ImproperlyConfigured(
+            f"MEDIA_ACCEL must be {X_ACCEL_REDIRECT} or {X_SENDFILE}"
+        )
+    response["Cache-Control"] = f"public, max-age={settings.MEDIA_MAX_AGE}"
+    return response
@@ -0,0 +1,198 @@
+"""Per-request metrics.
+
+MetricsMiddleware records for every request the view name, the number
+and total time of SQL queries, the time spent rendering templates and
+the cache hits and misses of the page caches. Each request is logged as
+a JSON line by the core.metrics logger at INFO level and added to
+per-view totals of the worker process, which the metrics view exposes
+in the Prometheus text format.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+COUNTERS = (
+    ("requests_total", "Requests handled"),
+    ("request_seconds_sum", "Time spent handling requests"),
+    ("db_queries_total", "SQL queries executed"),
+    ("db_seconds_sum", "Time spent executing SQL queries"),
+    ("template_seconds_sum", "Time spent rendering templates"),
+    ("cache_hits_total", "Page cache hits"),
+    ("cache_misses_total", "Page cache misses"),
+)
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+
+def get_current():
+    return getattr(_state, "metrics", None)
+
+
+def record_cache(hits=0, misses=0):
+    metrics = get_current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class Registry:
+    """Totals by view name of the requests handled by this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.buckets = defaultdict(lambda: [0] * len(BUCKETS))
+
+    def add(self, view_name, duration, metrics):
+        with self.lock:
+            counters = self.counters[view_name]
+            counters["requests_total"] += 1
+            counters["request_seconds_sum"] += duration
+            counters["db_queries_total"] += metrics.db_queries
+            counters["db_seconds_sum"] += metrics.db_time
+            counters["template_seconds_sum"] += metrics.template_time
+            counters["cache_hits_total"] += metrics.cache_hits
+            counters["cache_misses_total"] += metrics.cache_misses
+            buckets = self.buckets[view_name]
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+
+    def render(self):
+        with self.lock:
+            counters = {
+                view_name: dict(values)
+                for view_name, values in self.counters.items()
+            }
+            buckets = {
+                view_name: list(values)
+                for view_name, values in self.buckets.items()
+            }
+
+        lines = []
+        for name, description in COUNTERS:
+            lines.append(f"# HELP yatube_{name} {description}")
+            lines.append(f"# TYPE yatube_{name} counter")
+            for view_name, values in sorted(counters.items()):
+                lines.append(
+                    f'yatube_{name}{{view="{view_name}"}} {values[name]:g}'
+                )
+        lines.append("# HELP yatube_request_seconds Request duration")
+        lines.append("# TYPE yatube_request_seconds histogram")
+        for view_name, values in sorted(buckets.items()):
+            for bound, count in zip(BUCKETS, values):
+                lines.append(
+                    f'yatube_request_seconds_bucket{{view="{view_name}",'
+                    f'le="{bound}"}} {count}'
+                )
+            total = counters[view_name]
+            lines.append(
+                f'yatube_request_seconds_bucket{{view="{view_name}",'
+                f'le="+Inf"}} {total["requests_total"]:g}'
+            )
+            lines.append(
+                f'yatube_request_seconds_sum{{view="{view_name}"}} '
+                f'{total["request_seconds_sum"]:g}'
+            )
+            lines.append(
+                f'yatube_request_seconds_count{{view="{view_name}"}} '
+                f'{total["requests_total"]:g}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _state.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else "unresolved"
+        registry.add(view_name, duration, metrics)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "view": view_name,
+                "method": request.method,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "db_queries": metrics.db_queries,
+                "db_ms": round(metrics.db_time * 1000, 2),
+                "template_ms": round(metrics.template_time * 1000, 2),
+                "cache_hits": metrics.cache_hits,
+                "cache_misses": metrics.cache_misses,
+            }))
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = get_current()
+        if metrics is None:
+            return super().render(context, request)
+
+        # Templates rendered from another template, like the cached
+        # post cards, are already counted by the outer one.
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
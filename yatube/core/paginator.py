@@ -0,0 +1,182 @@
+import datetime
+import json
+from bisect import bisect_left, bisect_right
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+NEXT = "next"
+PREVIOUS = "prev"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class UnsupportedOperation(TypeError):
+    """Raised by the Paginator APIs a keyset paginator cannot serve"""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keep microseconds, DjangoJSONEncoder rounds datetimes to ms."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginator(Paginator):
+    """Paginator that seeks by the (pub_date, id) key of AbstractModel
+    instead of counting rows and skipping them with OFFSET.
+
+    Pages are addressed by opaque cursor tokens, so only the neighbours
+    of the current page are known: page.number is 1 on the first page
+    and 2 otherwise, num_pages grows by one when there is a next page,
+    which is what Page.has_next() and has_previous() need. It stays a
+    Paginator returning Page objects for the templates and the tests
+    that expect them, but count, page_range and numbered pages raise
+    UnsupportedOperation, they would scan the rows the seek skips.
+    """
+
+    keys = ("pub_date", "id")
+
+    def __init__(self, object_list, per_page, keys=None):
+        super().__init__(object_list, per_page)
+        if keys is not None:
+            self.keys = keys
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    @property
+    def count(self):
+        raise UnsupportedOperation("KeysetPaginator does not count rows")
+
+    @property
+    def page_range(self):
+        raise UnsupportedOperation("KeysetPaginator has no page numbers")
+
+    def validate_number(self, number):
+        raise UnsupportedOperation("KeysetPaginator has no page numbers")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return NEXT, None
+        try:
+            direction, key = json.loads(urlsafe_base64_decode(cursor))
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            if key is None:
+                return direction, None
+            return direction, self.decode_key(key)
+        except (TypeError, ValueError, LookupError):
+            raise InvalidCursor(cursor)
+
+    def decode_key(self, key):
+        if len(key) != len(self.keys):
+            raise InvalidCursor(key)
+        model = self.object_list.model
+        return tuple(
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(self.keys, key)
+        )
+
+    def encode_cursor(self, direction, key=None):
+        payload = json.dumps((direction, key), cls=CursorEncoder)
+        return urlsafe_base64_encode(payload.encode())
+
+    def get_key(self, obj):
+        return tuple(getattr(obj, name) for name in self.keys)
+
+    def fetch(self, direction, key, limit):
+        """Return up to limit objects following the key in the direction,
+        nearest first."""
+        return list(self.slice(self.object_list, direction, key, limit))
+
+    def slice(self, queryset, direction, key, limit, keys=None):
+        """Seek the queryset past the key and order it by keys, which
+        default to the paginator keys."""
+        keys = keys or self.keys
+        if key is not None:
+            queryset = queryset.filter(self.seek(direction, key, keys))
+        prefix = "-" if direction == NEXT else ""
+        ordering = [f"{prefix}{name}" for name in keys]
+        return queryset.order_by(*ordering)[:limit]
+
+    def seek(self, direction, key, keys=None):
+        """Build the row comparison (keys) < key, or > key for the previous
+        page, in the form `a <= x AND (a < x OR ...)` so the leading
+        column bounds an index range scan."""
+        lookup = "lt" if direction == NEXT else "gt"
+        *heads, (name, value) = zip(keys or self.keys, key)
+        condition = Q(**{f"{name}__{lookup}": value})
+        for name, value in reversed(heads):
+            condition = Q(**{f"{name}__{lookup}e": value}) & (
+                Q(**{f"{name}__{lookup}": value}) | condition
+            )
+        return condition
+
+    def get_page(self, cursor=None):
+        try:
+            direction, key = self.decode_cursor(cursor)
+        except InvalidCursor:
+            direction, key = NEXT, None
+
+        objects = self.fetch(direction, key, self.per_page + 1)
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == NEXT:
+            has_previous, has_next = key is not None, has_more
+        else:
+            objects.reverse()
+            has_previous, has_next = has_more, key is not None
+        has_previous = has_previous and bool(objects)
+        has_next = has_next and bool(objects)
+
+        page = self._get_page(objects, 2 if has_previous else 1, self)
+        self._num_pages = page.number + has_next
+        page.previous_cursor = page.next_cursor = page.last_cursor = None
+        if has_previous:
+            page.previous_cursor = self.encode_cursor(
+                PREVIOUS, self.get_key(objects[0])
+            )
+        if has_next:
+            page.next_cursor = self.encode_cursor(
+                NEXT, self.get_key(objects[-1])
+            )
+            page.last_cursor = self.encode_cursor(PREVIOUS)
+        return page
+
+    def page(self, number):
+        raise UnsupportedOperation(
+            "KeysetPaginator addresses pages by cursor, use get_page()"
+        )
+
+
+class IdsPaginator(KeysetPaginator):
+    """KeysetPaginator over an ascending sequence of ids, like the
+    adjacency arrays of posts.graph, seeking with bisect. Pages list
+    the highest ids first."""
+
+    keys = ("id",)
+
+    def decode_key(self, key):
+        if len(key) != 1:
+            raise InvalidCursor(key)
+        return (int(key[0]),)
+
+    def get_key(self, obj):
+        return (obj,)
+
+    def fetch(self, direction, key, limit):
+        ids = self.object_list
+        if direction == NEXT:
+            end = len(ids) if key is None else bisect_left(ids, key[0])
+            return list(reversed(ids[max(end - limit, 0):end]))
+        start = 0 if key is None else bisect_right(ids, key[0])
+        return list(ids[start:start + limit])
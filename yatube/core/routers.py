@@ -0,0 +1,93 @@
+"""Read replica routing.
+
+ReplicaMiddleware marks the requests to REPLICA_VIEWS, and ReplicaRouter
+sends their reads of the posts and auth models to an alias of
+DATABASE_REPLICAS picked at random once per request. Everything else,
+e.g. the table of the database cache, reads from and writes to the
+default database. Once a request
+writes, the rest of it and the requests of the same client during the
+next REPLICA_PIN_TIME seconds stay on the primary, so users see their
+own changes before the replicas catch up.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.dispatch import Signal
+
+PIN_COOKIE = "primary"
+
+pre_replica_sync = Signal()
+post_replica_sync = Signal()
+
+_state = threading.local()
+
+
+def start_request(use_replicas):
+    """Pick the replica the request reads from, one for the whole request
+    so its queries see a single sync point"""
+    replicas = settings.DATABASE_REPLICAS
+    _state.replica = (
+        random.choice(replicas) if use_replicas and replicas else None
+    )
+    _state.wrote = False
+
+
+def finish_request():
+    """Stop routing to replicas and return whether the request wrote"""
+    wrote = getattr(_state, "wrote", False)
+    start_request(False)
+    return wrote
+
+
+class ReplicaRouter:
+    route_app_labels = {"auth", "posts"}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            return getattr(_state, "replica", None)
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        _state.replica = None
+        _state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start_request(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = finish_request()
+
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_TIME,
+                httponly=True,
+                samesite="Lax"
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        start_request(
+            request.method in ("GET", "HEAD")
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and PIN_COOKIE not in request.COOKIES
+        )
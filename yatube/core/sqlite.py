@@ -0,0 +1,36 @@
+"""Tuning of SQLite connections.
+
+Every new connection to an SQLite database gets SQLITE_PRAGMAS: by
+default the WAL journal, so readers keep reading while a writer
+commits, synchronous=NORMAL, which is safe with WAL, a memory mapped
+database and a busy timeout instead of failing at once with "database
+is locked". Replicas are copied over by sync_replicas, so they keep
+their rollback journal, are opened read-only and are not persistent,
+each request opens the latest copy.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+READ_ONLY_PRAGMAS = ("busy_timeout", "mmap_size")
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = settings.SQLITE_PRAGMAS
+    if connection.alias in settings.DATABASE_REPLICAS:
+        pragmas = {
+            name: value for name, value in pragmas.items()
+            if name in READ_ONLY_PRAGMAS
+        }
+        pragmas["query_only"] = "ON"
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
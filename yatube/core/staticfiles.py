@@ -0,0 +1,191 @@
+"""Static files for production.
+
+CompressedManifestStorage is ManifestStaticFilesStorage that also writes
+gzip and, when the brotli package is installed, brotli copies of text
+files next to them at collectstatic time. StaticFilesApplication wraps
+the WSGI application and serves STATIC_ROOT itself: it picks the
+smallest encoding the client accepts, answers revalidation with 304,
+marks content-hashed names as immutable and hands files to the
+server's wsgi.file_wrapper, which sends them with sendfile() where the
+server supports it.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.handlers.wsgi import get_path_info
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_PATTERNS = (
+    "*.css", "*.html", "*.ico", "*.js", "*.json", "*.map", "*.svg", "*.txt",
+    "*.xml",
+)
+# Compressed copies saving less than this are not worth a lookup.
+MIN_RATIO = 0.95
+
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+BLOCK_SIZE = 64 * 1024
+
+
+def compress(data):
+    """Return the compressed variants of data by file suffix"""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data)
+    return variants
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in set(paths) | set(self.hashed_files.values()):
+            if matches_patterns(name, COMPRESS_PATTERNS):
+                self.write_compressed(name)
+
+    def write_compressed(self, name):
+        path = self.path(name)
+        with open(path, "rb") as source:
+            data = source.read()
+        for suffix, compressed in compress(data).items():
+            if len(compressed) < len(data) * MIN_RATIO:
+                with open(path + suffix, "wb") as target:
+                    target.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.cache_control = (
+            IMMUTABLE if immutable
+            else f"public, max-age={settings.STATIC_MAX_AGE}"
+        )
+        self.variants = {}
+        for encoding, suffix in (*ENCODINGS, (None, "")):
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = (
+                    path + suffix, os.stat(path + suffix).st_size
+                )
+
+        stat = os.stat(path)
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or "application/octet-stream"
+        )
+        if self.content_type.startswith("text/"):
+            self.content_type += "; charset=utf-8"
+        # Weak, the encodings of the file share it.
+        self.etag = f'W/"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.last_modified = int(stat.st_mtime)
+
+    def choose(self, accept_encoding):
+        accepted = {
+            part.split(";")[0].strip() for part in accept_encoding.split(",")
+        }
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding, *self.variants[encoding]
+        return None, *self.variants[None]
+
+    def is_fresh(self, environ):
+        etags = environ.get("HTTP_IF_NONE_MATCH")
+        if etags is not None:
+            return self.etag in (etag.strip() for etag in etags.split(","))
+        since = parse_http_date_safe(
+            environ.get("HTTP_IF_MODIFIED_SINCE", "")
+        )
+        return since is not None and self.last_modified <= since
+
+
+class StaticFilesApplication:
+    """WSGI application serving the collected static files and passing
+    other requests to application.
+
+    The files are listed once at startup, so a request for a static
+    file does not touch the file system before it is opened.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self.scan() if self.root else {}
+
+    def scan(self):
+        if not os.path.isdir(self.root):
+            return {}
+        manifest = os.path.join(self.root, "staticfiles.json")
+        hashed = set()
+        if os.path.isfile(manifest):
+            with open(manifest) as stream:
+                hashed = set(json.load(stream).get("paths", {}).values())
+
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, name)
+                url = os.path.relpath(path, self.root).replace(os.sep, "/")
+                files[self.prefix + url] = StaticFile(path, url in hashed)
+        return files
+
+    def __call__(self, environ, start_response):
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD"):
+            return self.application(environ, start_response)
+        path = posixpath.normpath(get_path_info(environ))
+        static_file = self.files.get(path)
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        headers = [
+            ("Cache-Control", static_file.cache_control),
+            ("ETag", static_file.etag),
+            ("Last-Modified", http_date(static_file.last_modified)),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if static_file.is_fresh(environ):
+            start_response("304 Not Modified", headers)
+            return []
+
+        encoding, path, size = static_file.choose(
+            environ.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        headers += [
+            ("Content-Length", str(size)),
+            ("Content-Type", static_file.content_type),
+        ]
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        stream = open(path, "rb")
+        if file_wrapper is not None:
+            return file_wrapper(stream, BLOCK_SIZE)
+        return iter_file(stream)
+
+
+def iter_file(stream):
+    with stream:
+        yield from iter(lambda: stream.read(BLOCK_SIZE), b"")
@@ -0,0 +1,59 @@
+"""Content-addressed file storage.
+
+ContentAddressedStorage hashes a file while it writes it to a temporary
+file and then moves it to a name made of the SHA-256 digest, e.g.
+posts/3f/3f2a...e1.gif under the upload_to directory. Saving the same
+content again keeps the existing file, so identical uploads share a
+file, and everything derived from it by name, like cached thumbnails.
+Files are never overwritten, which makes deleting them the job of
+whoever counts their references, see posts.blobs.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The name is chosen by _save from the content.
+        return name
+
+    def digest_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        directory = self.path(posixpath.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=directory, suffix=".part"
+        )
+        try:
+            with os.fdopen(descriptor, "wb") as temporary:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+
+            name = self.digest_name(name, digest.hexdigest())
+            path = self.path(name)
+            if os.path.exists(path):
+                # Tell clean_images the file is in use again.
+                os.utime(path)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_move_safe(temporary_path, path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return name
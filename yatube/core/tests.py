@@ -0,0 +1,422 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from posts.cache import make_key
+from posts.models import Post, User
+
+from .cache import acquire, get_or_build, release
+from .metrics import registry
+from .routers import (
+    PIN_COOKIE, ReplicaRouter, finish_request, post_replica_sync,
+    pre_replica_sync, start_request
+)
+from .staticfiles import IMMUTABLE, StaticFilesApplication
+
+
+class GetOrBuildTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.build = mock.Mock(side_effect=["first", "second"])
+
+    def test_value_built_once(self):
+        self.assertEqual(get_or_build("key", self.build, 60), "first")
+        self.assertEqual(get_or_build("key", self.build, 60), "first")
+
+        self.build.assert_called_once()
+
+    def test_expired_value_rebuilt_by_lock_holder_only(self):
+        get_or_build("key", self.build, 0)
+
+        acquire("lock:key", 60)
+        self.assertEqual(get_or_build("key", self.build, 60), "first")
+        release("lock:key")
+        self.assertEqual(get_or_build("key", self.build, 60), "second")
+
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_missing_value_waits_for_lock_holder(self):
+        acquire("lock:key", 60)
+
+        with mock.patch("core.cache.time.sleep") as sleep:
+            sleep.side_effect = lambda _: cache.set("key", ("built", 0))
+            self.assertEqual(get_or_build("key", self.build, 60), "built")
+
+        self.build.assert_not_called()
+
+    def test_file_cache_locked_by_lock_file(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+
+        with override_settings(
+            CACHES={"default": {"BACKEND": backend, "LOCATION": location}}
+        ):
+            self.assertTrue(acquire("lock:key", 60))
+            self.assertFalse(acquire("lock:key", 60))
+            cache.clear()
+            self.assertFalse(acquire("lock:key", 60))
+            release("lock:key")
+            self.assertTrue(acquire("lock:key", 60))
+            self.assertTrue(acquire("lock:key", 0))
+
+        self.assertEqual(
+            [os.path.splitext(name)[1] for name in os.listdir(location)],
+            [".lock"]
+        )
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="reader")
+        Post.objects.create(author=cls.user, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def get_logged_metrics(self):
+        with self.assertLogs("core.metrics", "INFO") as logs:
+            self.client.get(reverse("posts:index"))
+        return json.loads(logs.records[0].getMessage())
+
+    def test_request_logged(self):
+        first = self.get_logged_metrics()
+        second = self.get_logged_metrics()
+
+        self.assertEqual(first["view"], "posts:index")
+        self.assertEqual(first["status"], 200)
+        self.assertGreater(first["db_queries"], 0)
+        self.assertGreater(first["template_ms"], 0)
+        self.assertGreater(first["cache_misses"], 0)
+        self.assertEqual(second["cache_misses"], 0)
+        self.assertGreater(second["cache_hits"], 0)
+        self.assertLess(second["db_queries"], first["db_queries"])
+
+    def test_metrics_exported(self):
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+
+        self.assertContains(
+            response, 'yatube_requests_total{view="posts:index"} 2'
+        )
+        self.assertContains(
+            response,
+            'yatube_request_seconds_bucket{view="posts:index",le="+Inf"} 2'
+        )
+        self.assertContains(response, "yatube_db_queries_total")
+
+    def test_metrics_forbidden_without_token(self):
+        for authorization in ("", "Bearer wrong"):
+            response = self.client.get(
+                reverse("metrics"), HTTP_AUTHORIZATION=authorization
+            )
+            self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_off_without_token_set(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer "
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SQLiteConnectionTest(TestCase):
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout, = cursor.fetchone()
+            cursor.execute("PRAGMA synchronous")
+            synchronous, = cursor.fetchone()
+
+        self.assertEqual(
+            busy_timeout, settings.SQLITE_PRAGMAS["busy_timeout"]
+        )
+        self.assertEqual(synchronous, 1)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(author=cls.user, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        # The test database has no replica, so route to the primary
+        # and only count how often a replica was chosen.
+        patcher = mock.patch(
+            "core.routers.random.choice", return_value="default"
+        )
+        self.choice = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_feed_reads_from_replica(self):
+        self.client.get(reverse("posts:index"))
+
+        self.choice.assert_called_once()
+
+    def test_other_views_read_from_primary(self):
+        self.client.get(reverse("posts:post_create"))
+
+        self.choice.assert_not_called()
+
+    def test_writer_pinned_to_primary(self):
+        response = self.client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.id}),
+            {"text": "Комментарий"}
+        )
+        self.client.get(reverse("posts:index"))
+
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.choice.assert_not_called()
+
+    def test_cache_table_left_to_primary(self):
+        router = ReplicaRouter()
+        cache_entry = DatabaseCache("cache_table", {}).cache_model_class
+        start_request(True)
+        self.addCleanup(finish_request)
+
+        self.assertIsNone(router.db_for_read(cache_entry))
+        self.assertIsNone(router.db_for_write(cache_entry))
+        self.assertEqual(router.db_for_read(Post), "default")
+        self.assertFalse(finish_request())
+
+    def sync_replicas(self):
+        pre_replica_sync.send(sender=None)
+        post_replica_sync.send(sender=None)
+        return make_key("feed", "index")
+
+    def test_replica_sync_expires_changed_feeds(self):
+        synced_key = self.sync_replicas()
+        self.assertEqual(self.sync_replicas(), synced_key)
+
+        Post.objects.create(author=self.user, text="Новый пост")
+        changed_key = make_key("feed", "index")
+
+        self.assertNotEqual(changed_key, synced_key)
+        self.assertNotEqual(self.sync_replicas(), changed_key)
+
+
+class StaticFilesTest(TestCase):
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, root)
+        os.mkdir(os.path.join(source, "css"))
+        with open(os.path.join(source, "css", "site.css"), "w") as css:
+            css.write("body { margin: 0; }\n" * 100)
+        with open(os.path.join(source, "logo.png"), "wb") as png:
+            png.write(os.urandom(512))
+
+        settings_override = override_settings(
+            STATICFILES_DIRS=[source],
+            STATICFILES_STORAGE="core.staticfiles.CompressedManifestStorage",
+            STATIC_ROOT=root
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command("collectstatic", interactive=False, stdout=StringIO())
+
+        self.root = root
+        with open(os.path.join(root, "staticfiles.json")) as manifest:
+            self.hashed = json.load(manifest)["paths"]
+        self.application = StaticFilesApplication(self.django)
+
+    def django(self, environ, start_response):
+        start_response("404 Not Found", [])
+        return [b"django"]
+
+    def request(self, path, **headers):
+        environ = RequestFactory().get(path, **headers).environ
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        response["body"] = b"".join(self.application(environ, start_response))
+        return response
+
+    def test_text_files_compressed(self):
+        css = os.path.join(self.root, self.hashed["css/site.css"])
+        png = os.path.join(self.root, self.hashed["logo.png"])
+
+        self.assertTrue(os.path.exists(f"{css}.gz"))
+        self.assertFalse(os.path.exists(f"{png}.gz"))
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        response = self.request(
+            f"/static/{self.hashed['css/site.css']}",
+            HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+
+        self.assertEqual(response["status"], "200 OK")
+        self.assertEqual(response["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(response["headers"]["Cache-Control"], IMMUTABLE)
+        self.assertEqual(
+            gzip.decompress(response["body"]),
+            b"body { margin: 0; }\n" * 100
+        )
+
+    def test_unhashed_file_revalidated(self):
+        response = self.request("/static/css/site.css")
+        revalidated = self.request(
+            "/static/css/site.css",
+            HTTP_IF_NONE_MATCH=response["headers"]["ETag"]
+        )
+
+        self.assertNotIn("Content-Encoding", response["headers"])
+        self.assertNotIn("immutable", response["headers"]["Cache-Control"])
+        self.assertEqual(revalidated["status"], "304 Not Modified")
+        self.assertEqual(revalidated["body"], b"")
+
+    def test_other_paths_passed_to_django(self):
+        for path in ("/", "/static/missing.css", "/static/../manage.py"):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path)["body"], b"django")
+
+    def test_pages_link_hashed_files(self):
+        self.assertIn(
+            self.hashed["css/site.css"],
+            Template("{% load static %}{% static 'css/site.css' %}").render(
+                Context()
+            )
+        )
+
+
+class MediaTest(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        os.mkdir(os.path.join(root, "posts"))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(root, "posts", "image.png"), "wb") as image:
+            image.write(self.content)
+
+        settings_override = override_settings(MEDIA_ROOT=root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.root = root
+        self.url = reverse("media", args=("posts/image.png",))
+
+    def test_file_served(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+
+    def test_range_served(self):
+        cases = (
+            ("bytes=10-19", 10, 19),
+            ("bytes=1000-", 1000, 1023),
+            ("bytes=-24", 1000, 1023),
+            ("bytes=1000-5000", 1000, 1023),
+        )
+        for header, first, last in cases:
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT
+                )
+                self.assertEqual(
+                    b"".join(response.streaming_content),
+                    self.content[first:last + 1]
+                )
+                self.assertEqual(
+                    response["Content-Length"], str(last - first + 1)
+                )
+                self.assertEqual(
+                    response["Content-Range"], f"bytes {first}-{last}/1024"
+                )
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2000-")
+
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_multiple_and_stale_ranges_ignored(self):
+        cases = (
+            {"HTTP_RANGE": "bytes=0-9,20-29"},
+            {"HTTP_RANGE": "bytes=0-9", "HTTP_IF_RANGE": '"stale"'},
+        )
+        for headers in cases:
+            with self.subTest(headers=headers):
+                response = self.client.get(self.url, **headers)
+
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotIn("Content-Range", response)
+
+    def test_revalidated(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        range_response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(
+            range_response.status_code, HTTPStatus.PARTIAL_CONTENT
+        )
+
+    def test_missing_and_outside_files_not_found(self):
+        for path in (
+            "/media/posts/missing.png",
+            "/media/posts/",
+            "/media/../manage.py",
+            "/media/%2E%2E/manage.py",
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(
+                    self.client.get(path).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_offloaded_to_front_proxy(self):
+        with self.settings(MEDIA_ACCEL="x-accel-redirect"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/posts/image.png"
+        )
+        self.assertEqual(response.content, b"")
+
+        with self.settings(MEDIA_ACCEL="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Sendfile"],
+            os.path.join(self.root, "posts", "image.png")
+        )
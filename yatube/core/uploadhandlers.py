@@ -0,0 +1,62 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+HEADER_MAX_SIZE = 256 * 1024
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file chunk by chunk and skip the
+    ones that exceed MAX_UPLOAD_SIZE bytes or whose image header declares
+    more than MAX_IMAGE_PIXELS pixels, before anything decodes them.
+
+    Reasons of skipped files are stored in request.upload_errors
+    by field name."""
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.size = 0
+        self.header = BytesIO()
+
+    def reject(self, message):
+        if not hasattr(self.request, "upload_errors"):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+    def check_header(self, raw_data):
+        """Identify the image from the first bytes of the file without
+        decoding the bitmap. Files that are not identified by
+        HEADER_MAX_SIZE are left to the form validation."""
+        self.header.write(raw_data)
+        try:
+            with Image.open(BytesIO(self.header.getvalue())) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject_pixels()
+        except Exception:
+            if self.header.tell() >= HEADER_MAX_SIZE:
+                self.header = None
+            return
+
+        self.header = None
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            self.reject_pixels()
+
+    def reject_pixels(self):
+        self.reject(f"Изображение больше {settings.MAX_IMAGE_PIXELS} пикселей")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.MAX_UPLOAD_SIZE:
+            self.reject(
+                "Файл больше "
+                f"{filesizeformat(settings.MAX_UPLOAD_SIZE)}"
+            )
+        if self.header is not None:
+            self.check_header(raw_data)
+        return super().receive_data_chunk(raw_data, start)
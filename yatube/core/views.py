@@ -1,6 +1,15 @@
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
 from http import HTTPStatus
 
+from .media import accel_response, file_response, get_media_path
+from .metrics import registry
+
 
 def csrf_failure(request, reason=""):
     return render(
@@ -9,6 +18,30 @@ def csrf_failure(request, reason=""):
     )
 
 
+@require_safe
+def media(request, path):
+    full_path = get_media_path(path)
+    if settings.MEDIA_ACCEL:
+        return accel_response(path, full_path)
+    return file_response(request, full_path)
+
+
+def metrics(request):
+    """Serve the metrics to scrapers sending the bearer METRICS_TOKEN,
+    the view is off while no token is set"""
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(
+        request.META.get("HTTP_AUTHORIZATION", "").encode(), expected.encode()
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -18,7 +51,7 @@ def page_not_found(request, exception):
     )
 
 
-def permission_denied(request, reason=""):
+def permission_denied(request, exception):
     return render(
         request,
         template_name="core/403.html",
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    empty_value_display = "-пусто-"
+    list_display = (
+        "pk", "name", "status", "priority", "attempts", "run_at", "finished"
+    )
+    list_filter = ("status", "name")
+    search_fields = ("key", "name")
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,87 @@
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs.queue import claim, purge, requeue_stale, run
+
+PURGE_INTERVAL = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the queued jobs in a pool of threads, the most urgent first, "
+        "until interrupted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            default=settings.JOB_WORKERS,
+            type=int,
+            help="Number of jobs run at the same time"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            default=settings.JOB_POLL_INTERVAL,
+            type=float,
+            help="Seconds to wait when no job is due"
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more"
+        )
+
+    def handle(self, *args, workers, poll_interval, burst, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        slots = threading.BoundedSemaphore(workers)
+        executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="jobs"
+        )
+        purged = 0
+        count = 0
+
+        def release(future):
+            slots.release()
+
+        try:
+            while True:
+                slots.acquire()
+                requeue_stale()
+                job = claim(worker)
+                if job is None:
+                    slots.release()
+                    if burst:
+                        break
+                    if time.monotonic() - purged > PURGE_INTERVAL:
+                        purge()
+                        purged = time.monotonic()
+                    time.sleep(poll_interval)
+                    continue
+                count += 1
+                executor.submit(self.run, job).add_done_callback(release)
+        except KeyboardInterrupt:
+            self.stdout.write("Waiting for the running jobs to finish")
+        finally:
+            executor.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs"))
+
+    def run(self, job):
+        try:
+            run(job)
+        except Exception:
+            # The pool would keep the error in a future nobody reads, and
+            # the job stays running until requeue_stale picks it up.
+            logger.exception("Could not record the outcome of job %s", job)
+        finally:
+            connection.close()
@@ -0,0 +1,98 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A call of a function decorated with jobs.queue.task, waiting for
+    or done by the run_jobs worker"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Не выполнена"),
+    )
+
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попытки"
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата создания"
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Ошибка"
+    )
+    finished = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата завершения"
+    )
+    key = models.CharField(
+        blank=True,
+        max_length=255,
+        null=True,
+        unique=True,
+        verbose_name="Ключ идемпотентности"
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name="Максимум попыток"
+    )
+    name = models.CharField(
+        max_length=255,
+        verbose_name="Задача"
+    )
+    payload = models.TextField(
+        verbose_name="Аргументы"
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name="Приоритет"
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Запустить после"
+    )
+    started = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата запуска"
+    )
+    status = models.CharField(
+        choices=STATUSES,
+        default=QUEUED,
+        max_length=16,
+        verbose_name="Статус"
+    )
+    worker = models.CharField(
+        blank=True,
+        max_length=255,
+        verbose_name="Обработчик"
+    )
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        indexes = [
+            models.Index(
+                fields=("status", "-priority", "run_at", "id",),
+                name="job_status_priority_idx"
+            ),
+            models.Index(
+                fields=("status", "started",),
+                name="job_status_started_idx"
+            ),
+            models.Index(
+                fields=("status", "finished",),
+                name="job_status_finished_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
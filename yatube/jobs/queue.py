@@ -0,0 +1,156 @@
+"""A job queue in a database table.
+
+Functions decorated with task get an enqueue method, which stores the
+call as a Job row in the current transaction, so the job is queued only
+if the request commits. The run_jobs command claims due jobs by
+priority and runs them in a thread pool. A job that raises is retried
+with an exponential backoff until it runs out of attempts. Jobs of
+workers that died while running them are queued again after
+JOB_TIMEOUT, so tasks should be safe to run twice. A job with an
+idempotency key is queued once: until the job is purged, JOB_RETENTION
+seconds after it finished, enqueue calls with the same key return it.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(function=None, *, max_attempts=None, priority=0):
+    """Make the function runnable by the worker and add
+    function.enqueue(*args, key=None, priority=None, delay=None, **kwargs)
+    """
+    if function is None:
+        return partial(task, max_attempts=max_attempts, priority=priority)
+
+    function.is_task = True
+    function.enqueue = partial(
+        enqueue,
+        f"{function.__module__}.{function.__qualname__}",
+        default_priority=priority,
+        max_attempts=max_attempts
+    )
+    return function
+
+
+def enqueue(name, *args, key=None, priority=None, delay=None,
+            default_priority=0, max_attempts=None, **kwargs):
+    job = Job(
+        key=key,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        name=name,
+        payload=json.dumps({"args": args, "kwargs": kwargs}),
+        priority=default_priority if priority is None else priority,
+        run_at=timezone.now() + timedelta(seconds=delay or 0)
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.get(key=key)
+    return job
+
+
+def claim(worker):
+    """Mark the most urgent due job as running by worker and return it,
+    or None when no job is due"""
+    due = Job.objects.filter(
+        run_at__lte=timezone.now(),
+        status=Job.QUEUED
+    ).order_by("-priority", "run_at", "id").values_list("pk", flat=True)
+
+    # Another worker may claim a job between reading and updating it,
+    # then the update matches no row and the next job is tried.
+    for pk in due[:10]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            attempts=F("attempts") + 1,
+            started=timezone.now(),
+            status=Job.RUNNING,
+            worker=worker
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Call the function of a claimed job and record the outcome"""
+    try:
+        function = import_string(job.name)
+        if not getattr(function, "is_task", False):
+            raise ImportError(f"{job.name} is not a task")
+        payload = json.loads(job.payload)
+    except (ImportError, ValueError):
+        job.attempts = job.max_attempts
+        fail(job, traceback.format_exc())
+        return
+
+    try:
+        function(*payload["args"], **payload["kwargs"])
+    except Exception:
+        fail(job, traceback.format_exc())
+        return
+
+    job.status = Job.DONE
+    job.finished = timezone.now()
+    job.error = ""
+    # Done jobs are kept for a while, their arguments are not needed.
+    job.payload = ""
+    job.save(update_fields=("error", "finished", "payload", "status"))
+
+
+def fail(job, error):
+    job.error = error
+    if job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_at = timezone.now() + timedelta(
+            seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        )
+        logger.warning("Job %s failed, retrying at %s", job, job.run_at)
+    else:
+        job.status = Job.FAILED
+        job.finished = timezone.now()
+        logger.error("Job %s failed:\n%s", job, error)
+    job.save(update_fields=("error", "finished", "run_at", "status"))
+
+
+def run_next(worker):
+    """Claim and run one job, return it or None when no job is due"""
+    job = claim(worker)
+    if job is not None:
+        run(job)
+    return job
+
+
+def requeue_stale():
+    """Queue the jobs again that have been running for longer than
+    JOB_TIMEOUT, their worker is assumed dead"""
+    return Job.objects.filter(
+        started__lt=timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT),
+        status=Job.RUNNING
+    ).update(status=Job.QUEUED, run_at=timezone.now())
+
+
+def purge():
+    """Delete the jobs finished more than JOB_RETENTION seconds ago"""
+    deleted, _ = Job.objects.filter(
+        finished__lt=timezone.now() - timedelta(
+            seconds=settings.JOB_RETENTION
+        ),
+        status__in=(Job.DONE, Job.FAILED)
+    ).delete()
+    return deleted
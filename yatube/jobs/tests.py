@@ -0,0 +1,121 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import enqueue, purge, requeue_stale, run_next, task
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+def not_a_task():
+    pass
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_job_run(self):
+        record.enqueue("value")
+
+        job = run_next(worker="test")
+
+        self.assertEqual(calls, ["value"])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNone(run_next(worker="test"))
+
+    def test_urgent_jobs_run_first(self):
+        record.enqueue("late", priority=-1)
+        record.enqueue("normal")
+        record.enqueue("urgent", priority=5)
+        record.enqueue("delayed", priority=10, delay=60)
+
+        while run_next(worker="test"):
+            pass
+
+        self.assertEqual(calls, ["urgent", "normal", "late"])
+
+    def test_idempotency_key_queues_once(self):
+        first = record.enqueue("first", key="record")
+        second = record.enqueue("second", key="record")
+
+        while run_next(worker="test"):
+            pass
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(calls, ["first"])
+
+    def test_failed_job_retried_until_out_of_attempts(self):
+        job = explode.enqueue()
+
+        with self.assertLogs("jobs.queue", "WARNING"):
+            run_next(worker="test")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            run_next(worker="test")
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("RuntimeError: boom", job.error)
+
+    def test_only_tasks_run(self):
+        enqueue(f"{__name__}.not_a_task")
+
+        with self.assertLogs("jobs.queue", "ERROR"):
+            job = run_next(worker="test")
+
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_jobs_requeued(self):
+        job = record.enqueue("value")
+        Job.objects.update(
+            started=timezone.now() - timedelta(days=1),
+            status=Job.RUNNING
+        )
+
+        self.assertEqual(requeue_stale(), 1)
+        run_next(worker="test")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_old_jobs_purged(self):
+        record.enqueue("value")
+        run_next(worker="test")
+
+        later = timezone.now() + timedelta(days=30)
+
+        self.assertEqual(purge(), 0)
+        with mock.patch("jobs.queue.timezone.now", return_value=later):
+            self.assertEqual(purge(), 1)
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    def test_burst_runs_queued_jobs(self):
+        calls.clear()
+        for number in range(5):
+            record.enqueue(number)
+
+        call_command("run_jobs", burst=True, workers=2, stdout=StringIO())
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertFalse(Job.objects.exclude(status=Job.DONE))
@@ -0,0 +1,279 @@
+"""Load test of the posts URLs, see the benchmark command.
+
+seed() fills the database with fake users, groups, posts, comments and
+follows. run() requests every route of posts.urls through the WSGI
+application from a pool of threads and summarizes latency percentiles,
+SQL queries per request and memory allocated by a request per route.
+"""
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from mixer.backend.django import mixer
+
+from . import urls
+from .models import Comment, Follow, Group, Post, User
+
+CSRF_SECRET = "benchmark" * 3 + "token"
+
+
+def seed(users, groups, posts, comments, follows):
+    authors = mixer.cycle(users).blend(
+        User, username=mixer.sequence("user{0}")
+    )
+    communities = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence("group-{0}")
+    )
+    # Signals fill the counters, timelines and search index as they
+    # would for posts written through the site.
+    entries = mixer.cycle(posts).blend(
+        Post,
+        author=mixer.RANDOM(*authors),
+        group=(
+            random.choice([None, *communities]) for _ in range(posts)
+        ),
+        image="",
+        thumbnail=""
+    )
+    mixer.cycle(comments).blend(
+        Comment,
+        author=mixer.RANDOM(*authors),
+        post=mixer.RANDOM(*entries)
+    )
+
+    pairs = {
+        (user.pk, author.pk)
+        for user, author in (
+            random.sample(authors, 2)
+            for _ in range(min(follows, users * (users - 1)) * 2)
+        )
+    }
+    for user_id, author_id in islice(pairs, follows):
+        Follow.objects.create(author_id=author_id, user_id=user_id)
+
+
+class Sample:
+    """Random targets for the routes, taken from the seeded rows"""
+
+    def __init__(self):
+        self.posts = list(Post.objects.values_list("pk", "author_id"))
+        self.slugs = list(Group.objects.values_list("slug", flat=True))
+        self.usernames = dict(User.objects.values_list("pk", "username"))
+        self.words = [
+            word
+            for text in Post.objects.values_list("text", flat=True)[:100]
+            for word in text.split()
+        ]
+
+    def post_id(self):
+        return random.choice(self.posts)[0]
+
+    def username(self):
+        return random.choice(list(self.usernames.values()))
+
+
+def post_route(name):
+    return lambda sample: (
+        "GET", reverse(name, kwargs={"post_id": sample.post_id()}), {}
+    )
+
+
+def profile_route(name):
+    return lambda sample: (
+        "GET", reverse(name, kwargs={"username": sample.username()}), {}
+    )
+
+
+def edit_route(sample):
+    post_id, author_id = random.choice(sample.posts)
+    path = reverse("posts:post_edit", kwargs={"post_id": post_id})
+    return "GET", path, {}, author_id
+
+
+ROUTES = {
+    "posts:add_comment": lambda sample: (
+        "POST",
+        reverse("posts:add_comment", kwargs={"post_id": sample.post_id()}),
+        {"text": mixer.faker.sentence()},
+    ),
+    "posts:follow_index": lambda sample: (
+        "GET", reverse("posts:follow_index"), {}
+    ),
+    "posts:follow_suggestions": lambda sample: (
+        "GET", reverse("posts:follow_suggestions"), {}
+    ),
+    "posts:group_list": lambda sample: (
+        "GET",
+        reverse(
+            "posts:group_list", kwargs={"slug": random.choice(sample.slugs)}
+        ),
+        {},
+    ),
+    "posts:index": lambda sample: (
+        "GET", reverse("posts:index"), {}
+    ),
+    "posts:post_comments": post_route("posts:post_comments"),
+    "posts:post_create": lambda sample: (
+        "GET", reverse("posts:post_create"), {}
+    ),
+    "posts:post_detail": post_route("posts:post_detail"),
+    "posts:post_edit": edit_route,
+    "posts:profile": profile_route("posts:profile"),
+    "posts:profile_follow": profile_route("posts:profile_follow"),
+    "posts:profile_followers": profile_route("posts:profile_followers"),
+    "posts:profile_following": profile_route("posts:profile_following"),
+    "posts:profile_unfollow": profile_route("posts:profile_unfollow"),
+    "posts:search": lambda sample: (
+        "GET", reverse("posts:search"), {"q": random.choice(sample.words)}
+    ),
+}
+
+
+def get_missing_routes():
+    names = {
+        f"{urls.app_name}:{pattern.name}" for pattern in urls.urlpatterns
+    }
+    return sorted(names - ROUTES.keys())
+
+
+def log_in(users):
+    """Return the cookie header of a session of every user by id"""
+    cookies = {}
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        cookies[user.pk] = (
+            f"{settings.SESSION_COOKIE_NAME}={session_key}; "
+            f"{settings.CSRF_COOKIE_NAME}={CSRF_SECRET}"
+        )
+    return cookies
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries of the thread's connection,
+    the request_started signal resets the connection's query log."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Runner:
+    def __init__(self):
+        self.application = get_wsgi_application()
+        self.sample = Sample()
+        self.cookies = log_in(User.objects.all())
+
+    def prepare(self, name):
+        user_id = random.choice(list(self.cookies))
+        method, path, data, *author_id = ROUTES[name](self.sample)
+        if author_id:
+            user_id, = author_id
+        factory = RequestFactory(
+            HTTP_COOKIE=self.cookies[user_id],
+            HTTP_X_CSRFTOKEN=CSRF_SECRET
+        )
+        if method == "POST":
+            return factory.post(path, data).environ
+        return factory.get(path, data).environ
+
+    def call(self, name):
+        environ = self.prepare(name)
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = self.application(environ, start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            elapsed = time.perf_counter() - started
+        return name, elapsed, counter.count, statuses[0]
+
+    def measure_memory(self, name):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        self.call(name)
+        _, peak = tracemalloc.get_traced_memory()
+        return peak - baseline
+
+    def run(self, requests, concurrency):
+        names = sorted(ROUTES)
+        for name in names:
+            self.call(name)
+
+        tracemalloc.start()
+        try:
+            memory = {name: self.measure_memory(name) for name in names}
+        finally:
+            tracemalloc.stop()
+
+        jobs = [name for name in names for _ in range(requests)]
+        random.shuffle(jobs)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(self.call, jobs))
+        elapsed = time.perf_counter() - started
+
+        latencies = defaultdict(list)
+        queries = defaultdict(list)
+        statuses = defaultdict(Counter)
+        for name, latency, query_count, status in results:
+            latencies[name].append(latency * 1000)
+            queries[name].append(query_count)
+            statuses[name][status] += 1
+
+        return {
+            "requests_per_second": round(len(jobs) / elapsed, 1),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "routes": {
+                name: summarize(
+                    latencies[name],
+                    queries[name],
+                    statuses[name],
+                    memory[name]
+                )
+                for name in names
+            },
+        }
+
+
+def summarize(latencies, queries, statuses, memory):
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": sum(
+            count for status, count in statuses.items() if status >= 500
+        ),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "p50_ms": round(percentiles[49], 2),
+        "p95_ms": round(percentiles[94], 2),
+        "p99_ms": round(percentiles[98], 2),
+        "queries": round(statistics.mean(queries), 1),
+        "max_queries": max(queries),
+        "peak_memory_kib": round(memory / 1024, 1),
+    }
+
+
+def run(requests, concurrency):
+    return Runner().run(requests, concurrency)
@@ -0,0 +1,58 @@
+"""Reference counts of the post image files.
+
+Post images and thumbnails live in image_storage under the digest of
+their content, so posts with the same image share its files. A Blob
+row counts the posts referring to a file: posts.signals changes the
+counts when posts are saved or deleted, and generate_thumbnail when it
+replaces an upload. Files nobody refers to are deleted by the
+clean_images command once they have been unused for
+IMAGE_CLEANUP_DELAY seconds, which leaves time to the uploads that are
+about to refer to them again.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+
+from .models import Blob
+
+
+def change_references(names, delta):
+    """Add delta to the reference counts of the files, skipping empty
+    names"""
+    for name in filter(None, names):
+        updates = {
+            "modified": Now(),
+            "references": Greatest(F("references") + delta, 0),
+        }
+        if Blob.objects.filter(pk=name).update(**updates) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                Blob.objects.create(name=name, references=delta)
+        except IntegrityError:
+            Blob.objects.filter(pk=name).update(**updates)
+
+
+def get_derived(source):
+    """Return the names of the image and the thumbnail made of the
+    source file, None for the ones that were not made yet"""
+    derived = dict(
+        Blob.objects.filter(source=source).values_list("kind", "name")
+    )
+    for kind, name in derived.items():
+        # Mark them used, so clean_images does not delete them before
+        # the caller refers to them.
+        if not Blob.objects.filter(pk=name).update(modified=Now()):
+            derived[kind] = None
+    return derived.get(Blob.IMAGE), derived.get(Blob.THUMBNAIL)
+
+
+def set_derived(source, kind, name):
+    """Remember that the file name of kind was made of source"""
+    if Blob.objects.filter(pk=name).update(kind=kind, source=source):
+        return
+    try:
+        with transaction.atomic():
+            Blob.objects.create(kind=kind, name=name, source=source)
+    except IntegrityError:
+        Blob.objects.filter(pk=name).update(kind=kind, source=source)
@@ -0,0 +1,60 @@
+"""Versioned cache namespaces.
+
+Cached fragments embed the current version of their scope in the key.
+Signals bump the version when the underlying rows change, so entries can
+live long and are never served stale: old keys are simply not read again.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+REPLICAS_SCOPE = "replicas"
+
+
+def _version_key(scope):
+    return f"version:{scope}"
+
+
+def _initial_version():
+    # If the counter is evicted it restarts from the clock rather than
+    # from 1, so keys of the lost versions are not reused.
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.add(_version_key(scope), _initial_version(), None)
+
+
+def bump_version(*scopes):
+    """Invalidate the scopes now and once more after the transaction
+    commits, so a page rendered from the old rows meanwhile is dropped."""
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def make_key(scope, *parts):
+    digest = hashlib.md5(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+    version = get_version(scope)
+    if settings.DATABASE_REPLICAS:
+        # Pages may be rendered from a replica that lags behind the
+        # version, they are dropped when the replicas are synced.
+        version = f"{version}.{get_version(REPLICAS_SCOPE)}"
+    return f"{scope}:{version}:{digest}"
@@ -0,0 +1,165 @@
+"""Validators for conditional GET of the feeds.
+
+Each function returns the ETag of a feed page, and condition() answers
+304 Not Modified when it matches the request, before the view runs its
+list query or renders anything. The ETags combine the feed version of
+posts.cache, which signals bump whenever a post or group changes, with
+the query string. There is no Last-Modified: the newest pub_date stays
+the same when a post is edited and goes back when the newest one is
+deleted, so If-Modified-Since would get 304 for changed feeds.
+HTML pages also depend on the user, see conditional_page.
+"""
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import get_version
+from .models import Post, User
+
+
+def follow_scope(user_id):
+    """Cache scope bumped when the user follows or unfollows someone
+    and when someone follows or unfollows the user"""
+    return f"follow:{user_id}"
+
+
+def make_etag(*parts):
+    return hashlib.md5(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+
+
+def once_per_request(function):
+    """Compute the validator once per request, e.g. for the ETag of
+    condition() and the view reusing the state"""
+    @wraps(function)
+    def wrapper(request, *args, **kwargs):
+        states = request.__dict__.setdefault("_conditions", {})
+        key = (function.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in states:
+            states[key] = function(request, *args, **kwargs)
+        return states[key]
+    return wrapper
+
+
+@once_per_request
+def index_state(request):
+    return make_etag("index", get_version("feed"), request.GET.urlencode())
+
+
+@once_per_request
+def group_state(request, slug):
+    return make_etag(
+        "group", slug, get_version("feed"), request.GET.urlencode()
+    )
+
+
+@once_per_request
+def profile_state(request, username):
+    """Profiles also show the follow counters of the author"""
+    author_ids = User.objects.filter(username=username).values_list(
+        "pk", flat=True
+    )
+    # first() would sort the single row in a temporary B-tree.
+    author_id = next(iter(author_ids), None)
+    if author_id is None:
+        return None
+
+    return make_etag(
+        "profile",
+        username,
+        get_version("feed"),
+        get_version(follow_scope(author_id)),
+        request.GET.urlencode()
+    )
+
+
+@once_per_request
+def follow_state(request):
+    """Follow feeds depend on the user, so anonymous users get none"""
+    if not request.user.is_authenticated:
+        return None
+    return make_etag(
+        "follow",
+        request.user.pk,
+        get_version("feed"),
+        get_version(follow_scope(request.user.pk)),
+        request.GET.urlencode()
+    )
+
+
+@once_per_request
+def post_state(request, post_id):
+    """Posts change with their version, which saving the post, its
+    group or its author bumps, and with their comments"""
+    state = Post.objects.filter(pk=post_id).order_by().annotate(
+        comments_count=Count("comments"),
+        newest_comment=Max("comments__pub_date")
+    ).values_list("version", "comments_count", "newest_comment")
+    state = next(iter(state), None)
+    if state is None:
+        return None
+
+    return make_etag("post", post_id, *state, request.GET.urlencode())
+
+
+def conditional(state):
+    """condition() decorator taking the ETag from state"""
+    return condition(etag_func=state)
+
+
+def page_state(state):
+    """ETag of an HTML page showing the feed of state. Pages of logged
+    in users show their name, follow buttons and CSRF tokens, so their
+    ETags change with those."""
+    @wraps(state)
+    def wrapper(request, *args, **kwargs):
+        etag = state(request, *args, **kwargs)
+        if etag is None:
+            return None
+
+        # Sidebars show post counters of the authors and groups.
+        parts = (etag, get_version("feed"))
+        user = request.user
+        if not user.is_authenticated:
+            return make_etag(*parts)
+        return make_etag(
+            *parts,
+            user.pk,
+            user.username,
+            get_version(follow_scope(user.pk)),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        )
+    return wrapper
+
+
+def conditional_page(state):
+    """condition() for an HTML feed page, which also lets shared caches
+    keep the pages of anonymous users for FEED_MAX_AGE seconds and
+    makes browsers revalidate the pages of logged in users"""
+    page = page_state(state)
+
+    def decorator(view):
+        conditional_view = conditional(page)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (
+                HTTPStatus.OK, HTTPStatus.NOT_MODIFIED
+            ):
+                return response
+            if request.user.is_authenticated or response.cookies:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=settings.FEED_MAX_AGE
+                )
+            return response
+        return wrapper
+    return decorator
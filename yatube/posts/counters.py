@@ -0,0 +1,48 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import GroupCounter, UserCounter
+
+
+def _change(model, pk, **deltas):
+    if pk is None:
+        return
+
+    updates = {
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    }
+    if model.objects.filter(pk=pk).update(**updates):
+        return
+    if any(delta < 0 for delta in deltas.values()):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **deltas)
+    except IntegrityError:
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def change_group_counter(group_id, **deltas):
+    """Add deltas to the group counters, e.g. posts=1"""
+    _change(GroupCounter, group_id, **deltas)
+
+
+def change_user_counter(user_id, **deltas):
+    """Add deltas to the user counters, e.g. followers=-1"""
+    _change(UserCounter, user_id, **deltas)
+
+
+def get_group_counter(group):
+    return (
+        GroupCounter.objects.filter(pk=group.pk).first()
+        or GroupCounter(group=group)
+    )
+
+
+def get_user_counter(user):
+    return (
+        UserCounter.objects.filter(pk=user.pk).first()
+        or UserCounter(user=user)
+    )
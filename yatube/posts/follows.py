@@ -0,0 +1,20 @@
+"""The authors the current user follows, for follow buttons.
+
+get_followed_ids reads the ids of the followed authors from the
+adjacency arrays of posts.graph once per request, so views and
+templates check authors with a set lookup.
+"""
+from .graph import get_following
+
+
+def get_followed_ids(request):
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+
+    followed_ids = request.__dict__.get("_followed_ids")
+    if followed_ids is None:
+        followed_ids = request._followed_ids = frozenset(
+            get_following(user.pk)
+        )
+    return followed_ids
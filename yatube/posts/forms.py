@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Comment, Post
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -15,6 +15,21 @@ class PostForm(forms.ModelForm):
 
         model = Post
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, error in self.upload_errors.items():
+            self.add_error(field, error)
+        return cleaned_data
+
+    def save(self, commit=True):
+        if "image" in self.changed_data:
+            self.instance.thumbnail = ""
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -25,3 +40,34 @@ class CommentForm(forms.ModelForm):
         }
 
         model = Comment
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label="Запрос",
+        max_length=200
+    )
+    group = forms.ModelChoiceField(
+        empty_label="Все группы",
+        label="Группа",
+        queryset=Group.objects.all(),
+        required=False,
+        to_field_name="slug"
+    )
+    author = forms.ModelChoiceField(
+        error_messages={"invalid_choice": "Такого пользователя нет"},
+        label="Автор",
+        queryset=User.objects.all(),
+        required=False,
+        to_field_name="username",
+        widget=forms.TextInput
+    )
+
+    def get_filters(self):
+        """Return the post field lookups of the chosen group and author"""
+        filters = {}
+        if self.cleaned_data.get("group"):
+            filters["group_id"] = self.cleaned_data["group"].pk
+        if self.cleaned_data.get("author"):
+            filters["author_id"] = self.cleaned_data["author"].pk
+        return filters
@@ -0,0 +1,165 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.benchmark import get_missing_routes, run, seed
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark",
+    },
+}
+
+VOLUMES = {
+    "users": 100,
+    "groups": 10,
+    "posts": 2000,
+    "comments": 5000,
+    "follows": 1000,
+}
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            capture_output=True,
+            check=True,
+            text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database with fake data, request every posts URL "
+        "concurrently through the WSGI application and write latency, "
+        "query and memory statistics by route to a JSON file"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES.items():
+            parser.add_argument(
+                f"--{name}",
+                default=default,
+                type=int,
+                help=f"Number of {name} to seed"
+            )
+        parser.add_argument(
+            "--requests",
+            default=100,
+            type=int,
+            help="Requests per route"
+        )
+        parser.add_argument(
+            "--concurrency",
+            default=8,
+            type=int,
+            help="Number of threads sending requests"
+        )
+        parser.add_argument(
+            "--output",
+            default="benchmark.json",
+            help="File to write the results to"
+        )
+        parser.add_argument(
+            "--compare",
+            help="Results of an earlier run to print the changes against"
+        )
+
+    def handle(self, *args, **options):
+        missing = get_missing_routes()
+        if missing:
+            raise CommandError(
+                f"posts.benchmark.ROUTES lacks {', '.join(missing)}"
+            )
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2")
+        if options["users"] < 2 or options["posts"] < 1:
+            raise CommandError("Seed at least 2 users and 1 post")
+
+        volumes = {name: options[name] for name in VOLUMES}
+        with tempfile.TemporaryDirectory() as directory:
+            results = self.benchmark(directory, volumes, options)
+
+        results = {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "volumes": volumes,
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            **results,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(results, output, indent=2)
+
+        self.report(results)
+        if options["compare"]:
+            with open(options["compare"]) as previous:
+                self.compare(json.load(previous), results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote the results to {options['output']}"
+        ))
+
+    def benchmark(self, directory, volumes, options):
+        """Seed and load a throwaway test database, with a private cache
+        and without replicas, so the site's data is left alone"""
+        test_settings = connection.settings_dict["TEST"]
+        test_name = test_settings.get("NAME")
+        if connection.vendor == "sqlite":
+            test_settings["NAME"] = os.path.join(directory, "db.sqlite3")
+
+        with override_settings(CACHES=CACHES, DATABASE_REPLICAS=[]):
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                self.stdout.write("Seeding the database")
+                seed(**volumes)
+                self.stdout.write("Sending requests")
+                return run(options["requests"], options["concurrency"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = test_name
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'route':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'KiB':>9}{'errors':>8}"
+        )
+        for name, route in results["routes"].items():
+            self.stdout.write(
+                f"{name:<24}{route['p50_ms']:>9}{route['p95_ms']:>9}"
+                f"{route['p99_ms']:>9}{route['queries']:>9}"
+                f"{route['peak_memory_kib']:>9}{route['errors']:>8}"
+            )
+        self.stdout.write(
+            f"{results['requests_per_second']} requests per second, "
+            f"max RSS {results['max_rss_kib']} KiB"
+        )
+
+    def compare(self, previous, results):
+        self.stdout.write(
+            f"Changes since {previous.get('commit') or 'the previous run'}:"
+        )
+        for name, route in results["routes"].items():
+            before = previous["routes"].get(name)
+            if before is None:
+                self.stdout.write(f"{name:<24} new")
+                continue
+            changes = []
+            for key in ("p95_ms", "queries", "peak_memory_kib"):
+                if before[key]:
+                    change = (route[key] - before[key]) / before[key] * 100
+                    changes.append(f"{key} {change:+.0f}%")
+            self.stdout.write(f"{name:<24} " + ", ".join(changes))
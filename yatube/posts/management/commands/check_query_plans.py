@@ -0,0 +1,117 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+FULL_SCAN_RE = re.compile(r"^SCAN (TABLE )?\w+$")
+TEMP_B_TREE = "USE TEMP B-TREE"
+
+# The search view is left out, ranking sorts the hits by score.
+VIEWS = (
+    ("posts:follow_index", {}),
+    ("posts:follow_suggestions", {}),
+    ("posts:group_list", {"slug": "query-plans"}),
+    ("posts:index", {}),
+    ("posts:post_comments", {"post_id": None}),
+    ("posts:post_detail", {"post_id": None}),
+    ("posts:profile", {"username": "query-plans-author"}),
+    ("posts:profile_followers", {"username": "query-plans-author"}),
+    ("posts:profile_following", {"username": "query-plans-reader"}),
+)
+
+DUMMY_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN QUERY PLAN for every query of the post views and fail "
+        "if one of them scans a whole table or sorts in a temp B-tree"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the plan of every query, not only the failing ones"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN is specific to SQLite")
+
+        with transaction.atomic():
+            queries = self.capture_queries()
+            transaction.set_rollback(True)
+
+        failures = 0
+        for view_name, sql in queries:
+            plan = self.explain(sql)
+            problems = [
+                detail for detail in plan
+                if FULL_SCAN_RE.match(detail) or TEMP_B_TREE in detail
+            ]
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{view_name}: {sql}"))
+            elif options["verbose_plans"]:
+                self.stdout.write(f"{view_name}: {sql}")
+            if problems or options["verbose_plans"]:
+                for detail in plan:
+                    self.stdout.write(f"    {detail}")
+
+        if failures:
+            raise CommandError(f"{failures} queries need an index")
+        self.stdout.write(self.style.SUCCESS(
+            f"All {len(queries)} queries use indexes"
+        ))
+
+    def capture_queries(self):
+        """Request every view for sample rows, which are rolled back
+        afterwards, and return the SELECT queries they ran. The dummy
+        cache is in place before the rows are created, so their signals
+        do not bump the versions of the real cache."""
+        with override_settings(CACHES=DUMMY_CACHES):
+            author = User.objects.create_user(username="query-plans-author")
+            reader = User.objects.create_user(username="query-plans-reader")
+            group = Group.objects.create(
+                description="query-plans",
+                slug="query-plans",
+                title="query-plans"
+            )
+            post = Post.objects.create(
+                author=author, group=group, text="post"
+            )
+            Comment.objects.create(author=reader, post=post, text="comment")
+            Follow.objects.create(author=author, user=reader)
+
+            client = Client()
+            client.force_login(reader)
+
+            queries = []
+            for view_name, kwargs in VIEWS:
+                kwargs = {
+                    name: post.pk if value is None else value
+                    for name, value in kwargs.items()
+                }
+                with CaptureQueriesContext(connection) as context:
+                    client.get(reverse(view_name, kwargs=kwargs))
+                queries.extend(
+                    (view_name, query["sql"])
+                    for query in context.captured_queries
+                    if query["sql"].startswith("SELECT")
+                )
+        return queries
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
@@ -0,0 +1,111 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from posts.models import Blob, Post, image_storage
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Delete the post image files no post refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--delay",
+            default=settings.IMAGE_CLEANUP_DELAY,
+            help="Keep files used during the last seconds",
+            type=int
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help=(
+                "Count the references of the posts again and also delete "
+                "the files that have no reference count"
+            )
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options["delay"])
+        if options["recount"]:
+            self.recount()
+
+        names = list(Blob.objects.filter(
+            modified__lt=cutoff,
+            references=0
+        ).values_list("pk", flat=True))
+        deleted = 0
+        for name in names:
+            if self.is_recent(name, cutoff):
+                continue
+            # A post may have referred to the file since it was listed.
+            removed, _ = Blob.objects.filter(
+                modified__lt=cutoff,
+                name=name,
+                references=0
+            ).delete()
+            if removed:
+                image_storage.delete(name)
+                deleted += 1
+
+        if options["recount"]:
+            deleted += self.delete_untracked(cutoff)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} files"))
+
+    def is_recent(self, name, cutoff):
+        """Uploads of existing content touch the file before the post
+        refers to it"""
+        try:
+            modified = os.path.getmtime(image_storage.path(name))
+        except OSError:
+            return False
+        return modified >= cutoff.timestamp()
+
+    def recount(self):
+        counts = {}
+        posts = Post.objects.order_by()
+        for field in ("image", "thumbnail"):
+            for name, count in posts.exclude(**{field: ""}).values_list(
+                field
+            ).annotate(Count("pk")):
+                counts[name] = counts.get(name, 0) + count
+
+        with transaction.atomic():
+            Blob.objects.update(references=0)
+            blobs = Blob.objects.in_bulk(list(counts))
+            for blob in blobs.values():
+                blob.references = counts[blob.name]
+            Blob.objects.bulk_update(
+                blobs.values(), ("references",), batch_size=BATCH_SIZE
+            )
+            Blob.objects.bulk_create(
+                (
+                    Blob(name=name, references=count)
+                    for name, count in counts.items()
+                    if name not in blobs
+                ),
+                batch_size=BATCH_SIZE
+            )
+
+    def delete_untracked(self, cutoff):
+        """Delete the files of the post fields that have no Blob, like
+        aborted uploads and files saved before reference counting"""
+        tracked = set(Blob.objects.values_list("pk", flat=True))
+        root = image_storage.path("")
+        deleted = 0
+        for directory, _, files in os.walk(image_storage.path("posts")):
+            for file_name in files:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if name in tracked or self.is_recent(name, cutoff):
+                    continue
+                image_storage.delete(name)
+                deleted += 1
+        return deleted
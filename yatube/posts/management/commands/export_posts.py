@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import FORMATS, TRANSFERS, get_format
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the groups, posts, comments or follows to an NDJSON or CSV "
+        "file, one row at a time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=TRANSFERS)
+        parser.add_argument("path", help="File to write, - for stdout")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Defaults to csv for .csv files and ndjson otherwise"
+        )
+
+    def handle(self, *args, model, path, **options):
+        transfer = TRANSFERS[model]
+        write, _ = FORMATS[options["format"] or get_format(path)]
+
+        count = 0
+
+        def rows():
+            nonlocal count
+            for row in transfer.export_rows():
+                count += 1
+                yield row
+
+        if path == "-":
+            write(rows(), list(transfer.columns), self.stdout)
+            report = self.stderr
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as stream:
+                write(rows(), list(transfer.columns), stream)
+            report = self.stdout
+
+        report.write(self.style.SUCCESS(f"Exported {count} {model} rows"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnail
+
+
+class Command(BaseCommand):
+    help = "Generate the missing thumbnails of posts with images"
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image="").filter(
+            thumbnail=""
+        ).order_by().values_list("pk", flat=True)
+
+        count = 0
+        for post_id in post_ids.iterator():
+            generate_thumbnail(post_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {count} thumbnails"
+        ))
@@ -0,0 +1,113 @@
+import json
+import os
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.cache import bump_version
+from posts.transfer import (
+    BATCH_SIZE, FORMATS, TRANSFERS, get_format, keep_pub_date
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import groups, posts, comments or follows from an NDJSON or CSV "
+        "file written by export_posts. Rows are inserted with bulk_create, "
+        "a batch per transaction, and the number of imported rows is "
+        "saved to a checkpoint file after every batch, so an interrupted "
+        "import continues where it stopped. Rows that already exist or "
+        "break a constraint are skipped and counted. Counters, feeds and "
+        "the search index are rebuilt at the end"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=TRANSFERS)
+        parser.add_argument("path", help="File to read")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Defaults to csv for .csv files and ndjson otherwise"
+        )
+        parser.add_argument(
+            "--batch-size",
+            default=BATCH_SIZE,
+            type=int,
+            help="Rows inserted per transaction"
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Checkpoint file, defaults to the path with .checkpoint"
+        )
+
+    def handle(self, *args, model, path, **options):
+        transfer = TRANSFERS[model]
+        _, read = FORMATS[options["format"] or get_format(path)]
+        checkpoint = options["checkpoint"] or f"{path}.checkpoint"
+        batch_size = options["batch_size"]
+
+        done = self.read_checkpoint(checkpoint, model)
+        if done:
+            self.stdout.write(f"Skipping {done} rows imported before")
+
+        imported = skipped = 0
+        with open(path, newline="", encoding="utf-8") as stream:
+            rows = islice(read(stream), done, None)
+            with keep_pub_date(transfer.model):
+                for batch in iter(lambda: list(islice(rows, batch_size)), []):
+                    try:
+                        objects = transfer.build(batch, done + 1)
+                    except ValueError as error:
+                        raise CommandError(error)
+                    # ignore_conflicts drops the rows violating any
+                    # constraint, only SQLite's change counter tells how
+                    # many went in.
+                    with transaction.atomic():
+                        before = self.total_changes()
+                        transfer.model.objects.bulk_create(
+                            objects, ignore_conflicts=True
+                        )
+                        inserted = self.total_changes() - before
+                    done += len(batch)
+                    imported += inserted
+                    skipped += len(batch) - inserted
+                    self.write_checkpoint(checkpoint, model, done)
+
+        for command in transfer.rebuilds:
+            call_command(command, stdout=self.stdout)
+        bump_version(*transfer.scopes)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {model} rows"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {skipped} rows that already exist or break a "
+                "constraint"
+            ))
+
+    def total_changes(self):
+        """Rows inserted, updated or deleted by the connection so far"""
+        connection.ensure_connection()
+        return connection.connection.total_changes
+
+    def read_checkpoint(self, checkpoint, model):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as stream:
+            state = json.load(stream)
+        if state["model"] != model:
+            raise CommandError(
+                f"{checkpoint} belongs to an import of {state['model']}"
+            )
+        return state["rows"]
+
+    def write_checkpoint(self, checkpoint, model, rows):
+        temporary = f"{checkpoint}.tmp"
+        with open(temporary, "w") as stream:
+            json.dump({"model": model, "rows": rows}, stream)
+        os.replace(temporary, checkpoint)
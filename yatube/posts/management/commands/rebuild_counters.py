@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Follow, GroupCounter, Post, UserCounter
+
+BATCH_SIZE = 1000
+
+
+def count_by(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(Count("pk"))
+    )
+
+
+class Command(BaseCommand):
+    help = "Rebuild post and follow counters of users and groups from scratch"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            posts = count_by(Post.objects.all(), "author")
+            followers = count_by(Follow.objects.all(), "author")
+            following = count_by(Follow.objects.all(), "user")
+            group_posts = count_by(
+                Post.objects.filter(group__isnull=False), "group"
+            )
+
+            user_ids = set(posts) | set(followers) | set(following)
+            UserCounter.objects.all().delete()
+            UserCounter.objects.bulk_create(
+                (
+                    UserCounter(
+                        followers=followers.get(user_id, 0),
+                        following=following.get(user_id, 0),
+                        posts=posts.get(user_id, 0),
+                        user_id=user_id,
+                    )
+                    for user_id in user_ids
+                ),
+                batch_size=BATCH_SIZE
+            )
+
+            GroupCounter.objects.all().delete()
+            GroupCounter.objects.bulk_create(
+                (
+                    GroupCounter(group_id=group_id, posts=count)
+                    for group_id, count in group_posts.items()
+                ),
+                batch_size=BATCH_SIZE
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters of {len(user_ids)} users "
+            f"and {len(group_posts)} groups"
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend, rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of posts and comments"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the {type(get_backend()).__name__} search index"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, TimelineEntry
+from posts.timeline import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized follow feeds of all users from scratch"
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by().values_list("user_id", "author_id")
+
+        with transaction.atomic():
+            TimelineEntry.objects.all().delete()
+            for user_id, author_id in follows.iterator():
+                backfill(user_id, author_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {TimelineEntry.objects.count()} feed entries"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='posts/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
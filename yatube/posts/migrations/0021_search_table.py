@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_table(apps, schema_editor):
+    """Create the FTS5 index of posts.search when SQLite supports it,
+    otherwise the search falls back to the SearchTerm table."""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE posts_search USING fts5("
+            "text, post_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        pass
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_auto_20261018_2024'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
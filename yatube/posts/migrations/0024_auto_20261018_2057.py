@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-18 20:57
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_auto_20261018_2029'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('kind', models.CharField(blank=True, choices=[('image', 'Изображение'), ('thumbnail', 'Миниатюра')], max_length=16, verbose_name='Вид')),
+                ('modified', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+                ('source', models.CharField(blank=True, max_length=100, verbose_name='Исходный файл')),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=core.storage.ContentAddressedStorage(), upload_to='posts/thumbnails/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['source', 'kind'], name='blob_source_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['references', 'modified'], name='blob_references_modified_idx'),
+        ),
+    ]
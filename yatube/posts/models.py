@@ -2,11 +2,104 @@ from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.db import models
 from core.models import AbstractModel
+from core.storage import ContentAddressedStorage
 from django.db.models import F, Q
 
 User = get_user_model()
 
 
+image_storage = ContentAddressedStorage()
+
+
+class Blob(models.Model):
+    """A file of image_storage and the number of posts referring to it,
+    see posts.blobs. Images derived from an upload remember its name."""
+
+    IMAGE = "image"
+    THUMBNAIL = "thumbnail"
+    KINDS = (
+        (IMAGE, "Изображение"),
+        (THUMBNAIL, "Миниатюра"),
+    )
+
+    kind = models.CharField(
+        blank=True,
+        choices=KINDS,
+        max_length=16,
+        verbose_name="Вид"
+    )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения"
+    )
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name="Имя файла"
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество ссылок"
+    )
+    source = models.CharField(
+        blank=True,
+        max_length=100,
+        verbose_name="Исходный файл"
+    )
+
+    class Meta:
+        verbose_name = "Файл"
+        verbose_name_plural = "Файлы"
+        indexes = [
+            models.Index(
+                fields=("source", "kind",),
+                name="blob_source_kind_idx"
+            ),
+            models.Index(
+                fields=("references", "modified",),
+                name="blob_references_modified_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Join the author and load only the fields shown under a post"""
+        return self.select_related("author").only(
+            "author",
+            "author__first_name",
+            "author__last_name",
+            "author__username",
+            "id",
+            "pub_date",
+            "text",
+        )
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Join the author and group and load only the fields
+        shown on post cards and the post page"""
+        return self.select_related("author", "group").only(
+            "author",
+            "author__first_name",
+            "author__last_name",
+            "author__username",
+            "group",
+            "group__slug",
+            "group__title",
+            "id",
+            "image",
+            "pub_date",
+            "text",
+            "thumbnail",
+            "version",
+        )
+
+
 class Comment(AbstractModel):
     author = models.ForeignKey(
         on_delete=models.CASCADE,
@@ -24,10 +117,18 @@ class Comment(AbstractModel):
         verbose_name="Содержание комментария"
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = [F("pub_date").desc(nulls_last=True)]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=("post", "-pub_date", "-id",),
+                name="comment_post_pub_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.FIFTEEN]
@@ -57,10 +158,16 @@ class Follow(models.Model):
                 name="follow_exists"
             ),
             models.CheckConstraint(
-                check=Q(~(F("author") == F("user"))),
+                check=~Q(author=F("user")),
                 name="self follow is not accessed"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("user", "author",),
+                name="follow_user_author_idx"
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -84,6 +191,26 @@ class Group(models.Model):
         return self.title
 
 
+class GroupCounter(models.Model):
+    """Denormalized group statistics, kept up to date by posts.signals"""
+
+    group = models.OneToOneField(
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counter",
+        to="Group",
+        verbose_name="Группа"
+    )
+    posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество постов"
+    )
+
+    class Meta:
+        verbose_name = "Счётчики группы"
+        verbose_name_plural = "Счётчики групп"
+
+
 class Post(AbstractModel):
     author = models.ForeignKey(
         on_delete=models.CASCADE,
@@ -101,17 +228,153 @@ class Post(AbstractModel):
     )
     image = models.ImageField(
         blank=True,
+        storage=image_storage,
         upload_to="posts/",
         verbose_name="Изображение"
     )
     text = models.TextField(
         verbose_name="Текст"
     )
+    thumbnail = models.ImageField(
+        blank=True,
+        editable=False,
+        storage=image_storage,
+        upload_to="posts/thumbnails/",
+        verbose_name="Миниатюра"
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Версия"
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = [F("pub_date").desc(nulls_last=True)]
         verbose_name = "Публикация"
         verbose_name_plural = "Публикации"
+        indexes = [
+            models.Index(
+                fields=("author", "-pub_date", "-id",),
+                name="post_author_pub_date_idx"
+            ),
+            models.Index(
+                fields=("group", "-pub_date", "-id",),
+                name="post_group_pub_date_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.FIFTEEN]
+
+
+class SearchTerm(models.Model):
+    """A term of a post or comment in the inverted index used by
+    posts.search when SQLite FTS5 is not available"""
+
+    comment = models.ForeignKey(
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+        to="Comment",
+        verbose_name="Комментарий"
+    )
+    frequency = models.PositiveIntegerField(
+        verbose_name="Количество вхождений"
+    )
+    post = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name="+",
+        to="Post",
+        verbose_name="Публикация"
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name="Терм"
+    )
+
+    class Meta:
+        verbose_name = "Поисковый терм"
+        verbose_name_plural = "Поисковые термы"
+        indexes = [
+            models.Index(
+                fields=("term", "post",),
+                name="search_term_post_idx"
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """A post delivered to the follow feed of a user, see posts.timeline"""
+
+    author = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name="+",
+        to=User,
+        verbose_name="Автор"
+    )
+    post = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        to="Post",
+        verbose_name="Публикация"
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации"
+    )
+    user = models.ForeignKey(
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        to=User,
+        verbose_name="Подписчик"
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "post",),
+                name="timeline_entry_exists"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-pub_date", "-post",),
+                name="timeline_user_pub_date_idx"
+            ),
+            models.Index(
+                fields=("user", "author",),
+                name="timeline_user_author_idx"
+            ),
+        ]
+
+
+class UserCounter(models.Model):
+    """Denormalized user statistics, kept up to date by posts.signals"""
+
+    user = models.OneToOneField(
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counter",
+        to=User,
+        verbose_name="Пользователь"
+    )
+    followers = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество подписчиков"
+    )
+    following = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество подписок"
+    )
+    posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество постов"
+    )
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
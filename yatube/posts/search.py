@@ -0,0 +1,297 @@
+"""Full-text search over posts and their comments.
+
+Posts and comments are indexed as separate documents pointing to their
+post. On SQLite with FTS5 the documents live in the posts_search virtual
+table, a post is found when one of them contains all the query terms and
+is ranked by bm25. Otherwise they are kept in an inverted index of
+SearchTerm rows, the terms may be spread over the post and its comments
+and the post is ranked by tf-idf. posts.signals keeps both up to date
+as rows are saved and deleted, rebuild_search_index fills them from
+scratch.
+
+Scores depend on the whole index, so a cursor may skip or repeat a hit
+whose score changed while the user was paging through the results.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from core.paginator import NEXT, InvalidCursor, KeysetPaginator
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = "posts_search"
+MAX_TERMS = 10
+WORD_RE = re.compile(r"\w+")
+
+# Whether the FTS_TABLE exists, by database alias.
+_fts5_available = {}
+
+
+def tokenize(text):
+    max_length = SearchTerm._meta.get_field("term").max_length
+    return [word[:max_length] for word in WORD_RE.findall(text.lower())]
+
+
+def get_terms(query):
+    """Return the distinct terms of the query in their order"""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_TERMS]
+
+
+def read_connection():
+    """Connection the router picks for reading posts, a replica in the
+    requests to REPLICA_VIEWS"""
+    return connections[router.db_for_read(Post)]
+
+
+def write_connection():
+    return connections[router.db_for_write(Post)]
+
+
+class FTS5Backend:
+    """Documents are rows of the FTS_TABLE, a post under rowid 2 * id and
+    a comment under rowid 2 * id + 1."""
+
+    def _replace(self, rowid, post_id, text):
+        with write_connection().cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, post_id) "
+                "VALUES (%s, %s, %s)",
+                [rowid, text, post_id]
+            )
+
+    def _remove(self, rowid):
+        with write_connection().cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid]
+            )
+
+    def index_post(self, post):
+        self._replace(2 * post.pk, post.pk, post.text)
+
+    def index_comment(self, comment):
+        self._replace(2 * comment.pk + 1, comment.post_id, comment.text)
+
+    def remove_post(self, post_id):
+        self._remove(2 * post_id)
+
+    def remove_comment(self, comment_id):
+        self._remove(2 * comment_id + 1)
+
+    def clear(self):
+        with write_connection().cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, paginator, direction, key, limit):
+        """Return up to limit (score, post id) pairs of the paginator
+        query following the key in the direction, scored by the best
+        bm25 of the post documents"""
+        conditions = []
+        params = [" ".join(f'"{term}"' for term in paginator.terms)]
+        for name, value in paginator.filters.items():
+            conditions.append(f"post.{name} = %s")
+            params.append(value)
+        if key is not None:
+            operator = "<" if direction == NEXT else ">"
+            conditions.append(
+                f"(hit.score {operator} %s OR "
+                f"(hit.score = %s AND hit.post_id {operator} %s))"
+            )
+            params.extend((key[0], key[0], key[1]))
+        params.append(limit)
+
+        where = " AND ".join(conditions) or "1"
+        order = "DESC" if direction == NEXT else "ASC"
+        # bm25() cannot be aggregated directly, the subquery ranks the
+        # documents with the rank column first.
+        sql = f"""
+            SELECT hit.score, hit.post_id FROM (
+                SELECT post_id, MAX(score) AS score FROM (
+                    SELECT post_id, -rank AS score FROM {FTS_TABLE}
+                    WHERE {FTS_TABLE} MATCH %s
+                ) GROUP BY post_id
+            ) AS hit
+            INNER JOIN {Post._meta.db_table} AS post
+                ON post.id = hit.post_id
+            WHERE {where}
+            ORDER BY hit.score {order}, hit.post_id {order}
+            LIMIT %s
+        """
+        with read_connection().cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class InvertedIndexBackend:
+    """Documents are sets of SearchTerm rows with the number of times
+    each term occurs in the post or comment."""
+
+    def _replace(self, terms, text, **document):
+        terms.delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, frequency=frequency, **document)
+            for term, frequency in Counter(tokenize(text)).items()
+        )
+
+    def index_post(self, post):
+        self._replace(
+            SearchTerm.objects.filter(post_id=post.pk, comment=None),
+            post.text,
+            post_id=post.pk
+        )
+
+    def index_comment(self, comment):
+        self._replace(
+            SearchTerm.objects.filter(comment_id=comment.pk),
+            comment.text,
+            comment_id=comment.pk,
+            post_id=comment.post_id
+        )
+
+    def remove_post(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def remove_comment(self, comment_id):
+        SearchTerm.objects.filter(comment_id=comment_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def get_weights(self, terms):
+        """Return the inverse document frequency of each term, or None
+        when some term occurs nowhere"""
+        frequencies = dict(
+            SearchTerm.objects.filter(
+                term__in=terms
+            ).order_by().values_list("term").annotate(
+                Count("post", distinct=True)
+            )
+        )
+        if len(frequencies) < len(terms):
+            return None
+        total = Post.objects.order_by("-pk").values_list(
+            "pk", flat=True
+        ).first() or 1
+        return {
+            term: math.log(1 + total / frequency)
+            for term, frequency in frequencies.items()
+        }
+
+    def search(self, paginator, direction, key, limit):
+        terms = paginator.terms
+        weights = self.get_weights(terms)
+        if weights is None:
+            return []
+
+        hits = SearchTerm.objects.filter(
+            term__in=terms,
+            **{
+                f"post__{name}": value
+                for name, value in paginator.filters.items()
+            }
+        ).order_by().values("post_id").annotate(
+            matched=Count("term", distinct=True),
+            score=Sum(F("frequency") * Case(
+                *(When(term=term, then=Value(weight))
+                  for term, weight in weights.items()),
+                output_field=FloatField()
+            ), output_field=FloatField())
+        ).filter(matched=len(terms))
+        return list(paginator.slice(
+            hits, direction, key, limit, keys=("score", "post_id")
+        ).values_list("score", "post_id"))
+
+
+def fts5_available():
+    """Whether the database posts are read from has the FTS_TABLE"""
+    connection = read_connection()
+    if connection.alias not in _fts5_available:
+        _fts5_available[connection.alias] = (
+            connection.vendor == "sqlite"
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts5_available[connection.alias]
+
+
+def get_backend():
+    """Return the backend named by SEARCH_BACKEND, or FTS5 when the
+    database has its table and the inverted index otherwise"""
+    name = settings.SEARCH_BACKEND
+    if name is None:
+        name = "fts5" if fts5_available() else "inverted_index"
+    if name == "fts5":
+        return FTS5Backend()
+    return InvertedIndexBackend()
+
+
+def index_post(post):
+    get_backend().index_post(post)
+
+
+def index_comment(comment):
+    get_backend().index_comment(comment)
+
+
+def remove_post(post_id):
+    get_backend().remove_post(post_id)
+
+
+def remove_comment(comment_id):
+    get_backend().remove_comment(comment_id)
+
+
+def rebuild():
+    backend = get_backend()
+    backend.clear()
+    for post in Post.objects.only("id", "text").iterator():
+        backend.index_post(post)
+    comments = Comment.objects.only("id", "post_id", "text")
+    for comment in comments.iterator():
+        backend.index_comment(comment)
+
+
+class SearchPaginator(KeysetPaginator):
+    """Keyset paginator over the search hits, best first"""
+
+    keys = ("score", "id")
+
+    def __init__(self, object_list, per_page, query, filters=None):
+        super().__init__(object_list, per_page)
+        self.terms = get_terms(query)
+        self.filters = filters or {}
+        self.backend = get_backend()
+
+    def decode_key(self, key):
+        if len(key) != len(self.keys):
+            raise InvalidCursor(key)
+        score, post_id = key
+        return float(score), int(post_id)
+
+    def fetch(self, direction, key, limit):
+        if not self.terms:
+            return []
+        hits = self.backend.search(self, direction, key, limit)
+        posts = self.object_list.in_bulk([post_id for _, post_id in hits])
+        results = []
+        for score, post_id in hits:
+            if post_id in posts:
+                posts[post_id].score = score
+                results.append(posts[post_id])
+        return results
+
+
+def get_search_page(request, query, filters=None,
+                    per_page=settings.POSTS_PER_PAGE):
+    paginator = SearchPaginator(
+        Post.objects.for_feed(), per_page, query, filters
+    )
+    cursor = request.GET.get("cursor")
+
+    return paginator.get_page(cursor)
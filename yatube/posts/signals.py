@@ -0,0 +1,207 @@
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core.routers import post_replica_sync, pre_replica_sync
+
+from .blobs import change_references
+from .cache import REPLICAS_SCOPE, bump_version, get_version
+from .conditions import follow_scope
+from .counters import change_group_counter, change_user_counter
+from .graph import forget
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .search import index_comment, index_post, remove_comment, remove_post
+from .timeline import backfill, fan_out, prune, unfollowed
+
+AUTHOR_CARD_FIELDS = {"first_name", "last_name", "username"}
+
+IMAGE_FIELDS = ("image", "thumbnail")
+
+_replicated_feed_versions = {}
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved_post(sender, instance, raw, **kwargs):
+    """Store the author, group and images the post had before saving,
+    so post_save can move its counters and references, and bump its
+    version in the UPDATE itself, not to lose concurrent bumps."""
+    instance._saved_owners = None
+    instance._saved_images = None
+    if instance.pk is None or raw:
+        return
+
+    saved = Post.objects.filter(pk=instance.pk).values_list(
+        "author_id", "group_id", "image", "thumbnail"
+    ).first()
+    if saved is not None:
+        author_id, group_id, image, thumbnail = saved
+        instance._saved_owners = (author_id, group_id)
+        instance._saved_images = {"image": image, "thumbnail": thumbnail}
+        instance.version = F("version") + 1
+
+
+@receiver(post_save, sender=Post)
+def refresh_saved_version(sender, instance, **kwargs):
+    if not isinstance(instance.version, int):
+        instance.refresh_from_db(fields=["version"])
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+
+    saved_owners = getattr(instance, "_saved_owners", None)
+    if created:
+        change_user_counter(instance.author_id, posts=1)
+        change_group_counter(instance.group_id, posts=1)
+        fan_out(instance)
+    elif saved_owners:
+        old_author_id, old_group_id = saved_owners
+        if old_author_id != instance.author_id:
+            change_user_counter(old_author_id, posts=-1)
+            change_user_counter(instance.author_id, posts=1)
+            TimelineEntry.objects.filter(post=instance).delete()
+            fan_out(instance)
+        if old_group_id != instance.group_id:
+            change_group_counter(old_group_id, posts=-1)
+            change_group_counter(instance.group_id, posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_counter(instance.author_id, posts=-1)
+    change_group_counter(instance.group_id, posts=-1)
+
+
+def get_image_names(post, saved=None, update_fields=None):
+    """Return the image names of the post, taking the ones of fields
+    that were deferred or not saved from saved"""
+    deferred = post.get_deferred_fields()
+    names = {}
+    for field in IMAGE_FIELDS:
+        if saved is not None and (
+            field in deferred
+            or update_fields is not None and field not in update_fields
+        ):
+            names[field] = saved[field]
+        elif field not in deferred:
+            names[field] = getattr(post, field).name
+    return names
+
+
+@receiver(post_save, sender=Post)
+def reference_saved_images(sender, instance, created, raw, update_fields,
+                           **kwargs):
+    if raw:
+        return
+
+    saved = getattr(instance, "_saved_images", None)
+    if saved is None and not created:
+        return
+    names = get_image_names(instance, saved, update_fields)
+    old_names = saved or {}
+    for field, name in names.items():
+        if name != old_names.get(field):
+            change_references((name,), 1)
+            change_references((old_names.get(field),), -1)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_images(sender, instance, **kwargs):
+    change_references(get_image_names(instance).values(), -1)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw, **kwargs):
+    if not raw:
+        index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, raw, **kwargs):
+    if not raw:
+        index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_user_counter(instance.author_id, followers=1)
+        change_user_counter(instance.user_id, following=1)
+        backfill(instance.user_id, instance.author_id)
+        forget(instance.user_id, instance.author_id)
+        bump_version(
+            follow_scope(instance.author_id), follow_scope(instance.user_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    change_user_counter(instance.author_id, followers=-1)
+    change_user_counter(instance.user_id, following=-1)
+    prune(instance.user_id, instance.author_id)
+    unfollowed(instance.author_id)
+    forget(instance.user_id, instance.author_id)
+    bump_version(
+        follow_scope(instance.author_id), follow_scope(instance.user_id)
+    )
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Post)
+def invalidate_feeds(sender, **kwargs):
+    bump_version("feed")
+
+
+@receiver(post_save, sender=Group)
+def expire_group_post_cards(sender, instance, created, raw, **kwargs):
+    if not created and not raw:
+        instance.posts.update(version=F("version") + 1)
+
+
+@receiver(pre_delete, sender=Group)
+def expire_deleted_group_post_cards(sender, instance, **kwargs):
+    """The posts lose the group in a bulk UPDATE, which sends no signals
+    and leaves their cards linking to the group"""
+    instance.posts.update(version=F("version") + 1)
+
+
+@receiver(post_save, sender=User)
+def expire_author_post_cards(sender, instance, created, update_fields,
+                             raw, **kwargs):
+    if created or raw:
+        return
+    if update_fields and not AUTHOR_CARD_FIELDS.intersection(update_fields):
+        return
+    if instance.posts.update(version=F("version") + 1):
+        bump_version("feed")
+
+
+@receiver(pre_replica_sync)
+def remember_replicated_feed(sender, **kwargs):
+    _replicated_feed_versions["copying"] = get_version("feed")
+
+
+@receiver(post_replica_sync)
+def expire_replicated_feeds(sender, **kwargs):
+    """Drop the pages rendered from the replicas if the feeds changed
+    since the previous copy, the replicas have the new rows now."""
+    copied = _replicated_feed_versions["copying"]
+    if copied != _replicated_feed_versions.get("copied"):
+        bump_version(REPLICAS_SCOPE)
+    _replicated_feed_versions["copied"] = copied
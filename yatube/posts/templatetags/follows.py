@@ -0,0 +1,12 @@
+from django import template
+
+from ..follows import get_followed_ids
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author):
+    """Whether the current user follows the author, e.g.
+    {% is_following author as following %}"""
+    return author.pk in get_followed_ids(context["request"])
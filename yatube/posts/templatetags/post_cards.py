@@ -0,0 +1,35 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.metrics import record_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Return the rendered cards of the posts, taking the cached ones
+    from a single cache.get_many call"""
+    request = context["request"]
+    view_name = request.resolver_match.view_name
+    keys = {
+        f"post_card:{view_name}:{post.pk}:{post.version}": post
+        for post in posts
+    }
+
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template("includes/post_card.html")
+    for key, post in keys.items():
+        if key not in cards:
+            cards[key] = missing[key] = card_template.render(
+                {"post": post, "request": request}
+            )
+    record_cache(hits=len(keys) - len(missing), misses=len(missing))
+    if missing:
+        cache.set_many(missing, settings.CACHE_TIME)
+
+    return [mark_safe(cards[key]) for key in keys]
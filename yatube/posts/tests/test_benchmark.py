@@ -0,0 +1,17 @@
+from django.test import TestCase
+from posts.benchmark import get_missing_routes, seed
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class BenchmarkTest(TestCase):
+    def test_every_route_benchmarked(self):
+        self.assertEqual(get_missing_routes(), [])
+
+    def test_seed_volumes(self):
+        seed(users=3, groups=2, posts=5, comments=4, follows=2)
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 4)
+        self.assertEqual(Follow.objects.count(), 2)
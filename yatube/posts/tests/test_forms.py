@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -5,8 +6,11 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from jobs.models import Job
+from jobs.queue import run_next
 from posts.forms import PostForm
 from posts.models import Comment, Group, Post, User
+from PIL import Image
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -108,6 +112,7 @@ class PostFormsTest(TestCase):
             content=small_gif,
             content_type="image/gif"
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
 
         form_data = {
             "author": self.user,
@@ -129,7 +134,7 @@ class PostFormsTest(TestCase):
             Post.objects.filter(
                 author=self.user,
                 text=form_data.get("text"),
-                image=f"posts/{uploaded.name}"
+                image=f"posts/{digest[:2]}/{digest}.gif"
             ).exists(),
             True
         )
@@ -142,6 +147,77 @@ class PostFormsTest(TestCase):
             )
         )
 
+    def test_thumbnail_generated_for_uploaded_image(self):
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        form_data = {
+            "text": "Post with thumbnail",
+            "image": SimpleUploadedFile(
+                name="thumb.gif",
+                content=small_gif,
+                content_type="image/gif"
+            ),
+        }
+
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            data=form_data
+        )
+        post = Post.objects.get(text=form_data["text"])
+        placeholder_response = self.authorized_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.id})
+        )
+        job = run_next(worker="test")
+        post.refresh_from_db()
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.id})
+        )
+
+        self.assertEqual(job.name, "posts.thumbnails.generate_thumbnail")
+        self.assertEqual(job.status, Job.DONE)
+        self.assertContains(placeholder_response, "Изображение обрабатывается")
+        self.assertContains(response, post.thumbnail.url)
+        with Image.open(post.thumbnail) as thumbnail:
+            self.assertEqual(thumbnail.size, settings.POST_THUMBNAIL_SIZE)
+
+    def test_oversized_uploads_rejected(self):
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        limits = (
+            {"MAX_UPLOAD_SIZE": len(small_gif) - 1},
+            {"MAX_IMAGE_PIXELS": 1},
+        )
+        old_count_posts = Post.objects.count()
+
+        for limit in limits:
+            with self.subTest(limit=limit), override_settings(**limit):
+                response = self.authorized_client.post(
+                    reverse("posts:post_create"),
+                    data={
+                        "text": "Too big",
+                        "image": SimpleUploadedFile(
+                            name="big.gif",
+                            content=small_gif,
+                            content_type="image/gif"
+                        ),
+                    }
+                )
+
+                self.assertTrue(response.context["form"].errors["image"])
+                self.assertEqual(Post.objects.count(), old_count_posts)
+
     def test_edit_post_database(self):
         posts_count = Post.objects.count()
 
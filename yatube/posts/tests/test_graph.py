@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.graph import get_followers, get_following, get_mutual, suggest
+from posts.models import Follow, User
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.reader, cls.friend, cls.other, cls.popular, cls.niche = (
+            User.objects.create_user(username=username)
+            for username in ("reader", "friend", "other", "popular", "niche")
+        )
+        for user, author in (
+            (cls.reader, cls.friend),
+            (cls.reader, cls.other),
+            (cls.friend, cls.reader),
+            (cls.friend, cls.popular),
+            (cls.other, cls.popular),
+            (cls.other, cls.niche),
+        ):
+            Follow.objects.create(author=author, user=user)
+
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_adjacency_cached_and_expired_on_follow(self):
+        self.assertEqual(
+            list(get_following(self.reader.pk)),
+            [self.friend.pk, self.other.pk]
+        )
+        with self.assertNumQueries(0):
+            get_following(self.reader.pk)
+
+        Follow.objects.create(author=self.niche, user=self.reader)
+        Follow.objects.filter(author=self.popular, user=self.other).delete()
+
+        self.assertIn(self.niche.pk, get_following(self.reader.pk))
+        self.assertIn(self.reader.pk, get_followers(self.niche.pk))
+        self.assertNotIn(self.other.pk, get_followers(self.popular.pk))
+
+    def test_mutual_follows(self):
+        everyone = [self.friend.pk, self.other.pk, self.popular.pk]
+
+        self.assertEqual(
+            get_mutual(self.reader.pk, everyone), {self.friend.pk}
+        )
+        self.assertEqual(get_mutual(self.reader.pk, [self.other.pk]), set())
+        self.assertEqual(get_mutual(self.niche.pk, everyone), set())
+
+    def test_suggestions_ranked_by_overlap(self):
+        self.assertEqual(
+            suggest(self.reader.pk, 10),
+            [(self.popular.pk, 2), (self.niche.pk, 1)]
+        )
+        self.assertEqual(suggest(self.reader.pk, 1), [(self.popular.pk, 2)])
+        self.assertEqual(suggest(self.niche.pk, 10), [])
+
+    @override_settings(GRAPH_SUGGESTION_SOURCES=1)
+    def test_suggestion_sources_sampled(self):
+        with mock.patch(
+            "posts.graph.random.sample", return_value=[self.other.pk]
+        ) as sample:
+            suggestions = suggest(self.reader.pk, 10)
+
+        sample.assert_called_once()
+        self.assertEqual(
+            suggestions, [(self.popular.pk, 1), (self.niche.pk, 1)]
+        )
+
+    def test_suggestions_view(self):
+        response = self.reader_client.get(reverse("posts:follow_suggestions"))
+
+        self.assertEqual(
+            response.context["suggestions"],
+            [(self.popular, 2), (self.niche, 1)]
+        )
+        self.assertContains(
+            response,
+            reverse("posts:profile_follow", args=(self.popular.username,))
+        )
+
+    @override_settings(USERS_PER_PAGE=1)
+    def test_follow_lists_paginated(self):
+        url = reverse("posts:profile_following", args=(self.reader.username,))
+
+        first_page = self.reader_client.get(url).context["page_obj"]
+        second_page = self.reader_client.get(
+            url, {"cursor": first_page.next_cursor}
+        ).context["page_obj"]
+        followers = self.client.get(
+            reverse("posts:profile_followers", args=(self.popular.username,))
+        ).context["page_obj"]
+
+        self.assertEqual(list(first_page), [self.other])
+        self.assertEqual(list(second_page), [self.friend])
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(list(followers), [self.other])
+
+    def test_mutual_follows_marked(self):
+        response = self.client.get(
+            reverse("posts:profile_followers", args=(self.reader.username,))
+        )
+
+        self.assertContains(response, "взаимная подписка")
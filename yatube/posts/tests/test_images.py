@@ -0,0 +1,121 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts.models import Blob, Post, User, image_storage
+from posts.thumbnails import generate_thumbnail
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+def upload(name="small.gif", content=SMALL_GIF):
+    return SimpleUploadedFile(
+        content=content,
+        content_type="image/gif",
+        name=name
+    )
+
+
+class ImageStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Uploader")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_post(self, image):
+        return Post.objects.create(author=self.user, image=image, text="Meme")
+
+    def references(self, name):
+        blob = Blob.objects.filter(pk=name).first()
+        return blob and blob.references
+
+    def clean(self, *args):
+        call_command("clean_images", *args, stdout=StringIO())
+
+    def test_identical_uploads_stored_once(self):
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+
+        first = self.create_post(upload("meme.gif"))
+        second = self.create_post(upload("MEME.GIF"))
+
+        self.assertEqual(first.image.name, f"posts/{digest[:2]}/{digest}.gif")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [os.path.basename(first.image.name)]
+        )
+        self.assertEqual(self.references(first.image.name), 2)
+
+    def test_thumbnail_shared_by_identical_uploads(self):
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        uploaded_name = first.image.name
+        Post.objects.filter(pk__in=(first.pk, second.pk)).update(
+            thumbnail=""
+        )
+
+        generate_thumbnail(first.pk)
+        with mock.patch("posts.thumbnails.render_thumbnail") as render:
+            generate_thumbnail(second.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+
+        render.assert_not_called()
+        self.assertEqual(second.thumbnail.name, first.thumbnail.name)
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(self.references(first.thumbnail.name), 2)
+        self.assertEqual(self.references(uploaded_name), 0)
+
+    def test_unused_files_cleaned(self):
+        kept = self.create_post(upload())
+        edited = self.create_post(upload("other.gif", SMALL_GIF + b"\x00"))
+        deleted = self.create_post(upload("third.gif", SMALL_GIF + b"\x01"))
+        old_name, deleted_name = edited.image.name, deleted.image.name
+
+        edited.image = upload("new.gif", SMALL_GIF + b"\x02")
+        edited.save()
+        deleted.delete()
+        self.clean()
+        self.assertTrue(image_storage.exists(old_name))
+
+        self.clean("--delay", "0")
+
+        self.assertTrue(image_storage.exists(kept.image.name))
+        self.assertTrue(image_storage.exists(edited.image.name))
+        self.assertFalse(image_storage.exists(old_name))
+        self.assertFalse(image_storage.exists(deleted_name))
+        self.assertFalse(Blob.objects.filter(pk=old_name).exists())
+
+    def test_recount_tracks_posts_and_deletes_untracked_files(self):
+        post = self.create_post(upload())
+        untracked = image_storage.save(
+            "posts/lost.gif", upload("lost.gif", SMALL_GIF + b"\x03")
+        )
+        Blob.objects.all().delete()
+
+        self.clean("--delay", "0", "--recount")
+
+        self.assertEqual(self.references(post.image.name), 1)
+        self.assertTrue(image_storage.exists(post.image.name))
+        self.assertFalse(image_storage.exists(untracked))
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase
-from posts.models import Group, Post
+from posts.models import Follow, Group, GroupCounter, Post, UserCounter
 
 User = get_user_model()
 
@@ -43,3 +46,65 @@ class PostGroupModelsTest(TestCase):
                     self.post._meta.get_field(field).verbose_name,
                     expected_value
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="author")
+        cls.follower = User.objects.create_user(username="follower")
+
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="counters",
+            title="Группа"
+        )
+
+    def test_post_counters_follow_post_lifecycle(self):
+        post = Post.objects.create(
+            author=self.author,
+            group=self.group,
+            text="Пост"
+        )
+        self.assertEqual(UserCounter.objects.get(user=self.author).posts, 1)
+        self.assertEqual(GroupCounter.objects.get(group=self.group).posts, 1)
+
+        post.group = None
+        post.save()
+        self.assertEqual(GroupCounter.objects.get(group=self.group).posts, 0)
+
+        post.delete()
+        self.assertEqual(UserCounter.objects.get(user=self.author).posts, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(author=self.author, user=self.follower)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).followers, 1
+        )
+        self.assertEqual(
+            UserCounter.objects.get(user=self.follower).following, 1
+        )
+
+        follow.delete()
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).followers, 0
+        )
+
+    def test_rebuild_counters_command(self):
+        Post.objects.bulk_create(
+            [Post(author=self.author, group=self.group, text="Пост")] * 3
+        )
+        Follow.objects.create(author=self.author, user=self.follower)
+        UserCounter.objects.all().delete()
+
+        call_command("rebuild_counters", stdout=StringIO())
+
+        counter = UserCounter.objects.get(user=self.author)
+        self.assertEqual(counter.posts, 3)
+        self.assertEqual(counter.followers, 1)
+        self.assertEqual(GroupCounter.objects.get(group=self.group).posts, 3)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.follower).following, 1
+        )
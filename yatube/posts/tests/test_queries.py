@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.cache import get_version
+from posts.models import Comment, Follow, Group, Post, User
+
+from .utils import assert_constant_queries
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        Follow.objects.create(author=cls.author, user=cls.reader)
+
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="queries",
+            title="Группа"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text="Пост"
+        )
+
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def add_posts(self):
+        for number in range(5):
+            author = User.objects.create_user(username=f"author {number}")
+            group = Group.objects.create(
+                description="Описание",
+                slug=f"queries-{number}",
+                title="Группа"
+            )
+            Post.objects.create(author=author, group=group, text="Пост")
+            Post.objects.create(author=self.author, group=group, text="Пост")
+            Post.objects.create(author=author, group=self.group, text="Пост")
+
+    def add_comments(self):
+        for number in range(5):
+            author = User.objects.create_user(username=f"commenter {number}")
+            Comment.objects.create(author=author, post=self.post, text="!")
+
+    def add_followers(self):
+        for number in range(5):
+            follower = User.objects.create_user(username=f"fan {number}")
+            Follow.objects.create(author=self.author, user=follower)
+
+    def assert_feed_queries_constant(self, url):
+        assert_constant_queries(self, self.reader_client, url, self.add_posts)
+
+    def test_feed_queries_use_indexes(self):
+        version = get_version("feed")
+
+        call_command("check_query_plans", stdout=StringIO())
+
+        self.assertEqual(get_version("feed"), version)
+
+    def test_follow_index_queries(self):
+        self.assert_feed_queries_constant(reverse("posts:follow_index"))
+
+    def test_group_posts_queries(self):
+        self.assert_feed_queries_constant(
+            reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        )
+
+    def test_index_queries(self):
+        self.assert_feed_queries_constant(reverse("posts:index"))
+
+    def test_post_detail_queries(self):
+        assert_constant_queries(
+            self,
+            self.reader_client,
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id}),
+            self.add_comments
+        )
+
+    def test_post_comments_queries(self):
+        assert_constant_queries(
+            self,
+            self.reader_client,
+            reverse("posts:post_comments", kwargs={"post_id": self.post.id}),
+            self.add_comments
+        )
+
+    def test_follow_list_queries(self):
+        fan = User.objects.create_user(username="fan")
+        Follow.objects.create(author=self.author, user=fan)
+
+        assert_constant_queries(
+            self,
+            self.reader_client,
+            reverse(
+                "posts:profile_followers", kwargs={"username": self.author}
+            ),
+            self.add_followers
+        )
+
+    def test_profile_queries(self):
+        self.assert_feed_queries_constant(
+            reverse("posts:profile", kwargs={"username": self.author})
+        )
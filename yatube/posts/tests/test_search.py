@@ -0,0 +1,144 @@
+from unittest import SkipTest, mock
+
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Group, Post, User
+from posts.search import fts5_available
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="author")
+        cls.commenter = User.objects.create_user(username="commenter")
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="search",
+            title="Группа"
+        )
+
+        cls.post_in_group = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text="Кошка спит на окне"
+        )
+        cls.post_of_commenter = Post.objects.create(
+            author=cls.commenter,
+            text="Кошка кошка кошка"
+        )
+        cls.post_commented = Post.objects.create(
+            author=cls.author,
+            text="Собака во дворе"
+        )
+        Comment.objects.create(
+            author=cls.commenter,
+            post=cls.post_commented,
+            text="А у меня кошка"
+        )
+
+    def search(self, **params):
+        response = self.client.get(reverse("posts:search"), params)
+        return [post.pk for post in response.context["page_obj"]]
+
+    def test_search_posts_and_comments(self):
+        found = self.search(q="Кошка")
+        self.assertEqual(found[0], self.post_of_commenter.pk)
+        self.assertCountEqual(
+            found,
+            [
+                self.post_commented.pk,
+                self.post_in_group.pk,
+                self.post_of_commenter.pk,
+            ]
+        )
+        self.assertEqual(self.search(q="собака"), [self.post_commented.pk])
+        self.assertEqual(self.search(q="кошка на окне"),
+                         [self.post_in_group.pk])
+        self.assertEqual(self.search(q="жираф"), [])
+
+    def test_search_filters(self):
+        self.assertEqual(
+            self.search(q="кошка", group=self.group.slug),
+            [self.post_in_group.pk]
+        )
+        self.assertCountEqual(
+            self.search(q="кошка", author=self.author.username),
+            [self.post_commented.pk, self.post_in_group.pk]
+        )
+
+    def test_unknown_author_rejected(self):
+        response = self.client.get(
+            reverse("posts:search"), {"q": "кошка", "author": "nobody"}
+        )
+
+        self.assertIsNone(response.context["page_obj"])
+        self.assertTrue(response.context["form"].errors["author"])
+
+    def test_index_updated_on_change(self):
+        post = Post.objects.create(author=self.author, text="Попугай")
+        self.assertEqual(self.search(q="попугай"), [post.pk])
+
+        post.text = "Хомяк"
+        post.save()
+        self.assertEqual(self.search(q="попугай"), [])
+        self.assertEqual(self.search(q="хомяк"), [post.pk])
+
+        comment = Comment.objects.create(
+            author=self.author, post=self.post_in_group, text="Хомяк"
+        )
+        self.assertCountEqual(
+            self.search(q="хомяк"), [post.pk, self.post_in_group.pk]
+        )
+
+        comment.delete()
+        post.delete()
+        self.assertEqual(self.search(q="хомяк"), [])
+
+    def test_search_pages(self):
+        posts = [
+            Post.objects.create(author=self.author, text="Черепаха")
+            for _ in range(15)
+        ]
+        response = self.client.get(reverse("posts:search"), {"q": "черепаха"})
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, "q=%D1%87%D0%B5")
+
+        response = self.client.get(
+            reverse("posts:search"),
+            {"q": "черепаха", "cursor": page_obj.next_cursor}
+        )
+        found = [post.pk for post in page_obj]
+        found += [post.pk for post in response.context["page_obj"]]
+        self.assertCountEqual(found, [post.pk for post in posts])
+        self.assertFalse(response.context["page_obj"].has_next())
+
+
+@override_settings(SEARCH_BACKEND="inverted_index")
+class InvertedIndexSearchTest(SearchTestMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class FTS5SearchTest(SearchTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not fts5_available():
+            raise SkipTest("SQLite is built without FTS5")
+        super().setUpClass()
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_search_reads_from_replica(self):
+        # The test database has no replica, so route to the primary
+        # and only check the index is queried on the chosen alias.
+        with mock.patch(
+            "core.routers.random.choice", return_value="default"
+        ) as choice, mock.patch("posts.search.connections") as aliases:
+            aliases.__getitem__.side_effect = connections.__getitem__
+            self.assertEqual(self.search(q="собака"), [self.post_commented.pk])
+
+        choice.assert_called_once()
+        aliases.__getitem__.assert_called_with(choice.return_value)
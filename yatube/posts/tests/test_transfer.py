@@ -0,0 +1,124 @@
+import datetime as dt
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from posts.models import Comment, Follow, Group, Post, User, UserCounter
+
+MODELS = ("group", "post", "comment", "follow")
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="group",
+            title="Группа"
+        )
+        cls.pub_date = timezone.now() - dt.timedelta(days=30)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f"Пост, номер {number}"
+            )
+            for number in range(3)
+        ]
+        Post.objects.update(pub_date=cls.pub_date)
+        Comment.objects.create(
+            author=cls.reader, post=cls.posts[0], text="Комментарий"
+        )
+        Follow.objects.create(author=cls.author, user=cls.reader)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, extension):
+        paths = {}
+        for model in MODELS:
+            paths[model] = os.path.join(
+                self.directory, f"{model}.{extension}"
+            )
+            call_command(
+                "export_posts", model, paths[model], stdout=StringIO()
+            )
+        return paths
+
+    def import_(self, model, path, **options):
+        stdout = StringIO()
+        call_command("import_posts", model, path, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def delete_all(self):
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+
+    def assert_restored(self):
+        self.assertEqual(Group.objects.get().slug, "group")
+        self.assertEqual(
+            sorted(Post.objects.values_list("id", "group_id", "text")),
+            sorted(
+                (post.id, post.group_id, post.text) for post in self.posts
+            )
+        )
+        self.assertFalse(Post.objects.exclude(pub_date=self.pub_date))
+        self.assertEqual(Comment.objects.get().post_id, self.posts[0].id)
+        self.assertTrue(
+            Follow.objects.filter(author=self.author, user=self.reader)
+        )
+        self.assertEqual(UserCounter.objects.get(pk=self.author.pk).posts, 3)
+        self.assertEqual(self.reader.timeline.count(), 3)
+
+    def test_round_trip(self):
+        for extension in ("ndjson", "csv"):
+            with self.subTest(extension=extension):
+                paths = self.export(extension)
+                self.delete_all()
+
+                for model in MODELS:
+                    self.import_(model, paths[model], batch_size=2)
+
+                self.assert_restored()
+
+    def test_import_resumed_from_checkpoint(self):
+        path = self.export("ndjson")["post"]
+        with open(f"{path}.checkpoint", "w") as checkpoint:
+            json.dump({"model": "post", "rows": 2}, checkpoint)
+        Post.objects.all().delete()
+
+        self.import_("post", path)
+
+        self.assertEqual(
+            list(Post.objects.values_list("id", flat=True)),
+            [self.posts[2].id]
+        )
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_import_skips_existing_rows(self):
+        path = self.export("ndjson")["post"]
+        Post.objects.filter(pk=self.posts[0].pk).delete()
+
+        output = self.import_("post", path)
+
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn("Imported 1 post rows", output)
+        self.assertIn("Skipped 2 rows", output)
+
+    def test_unknown_user_rejected(self):
+        path = os.path.join(self.directory, "follow.ndjson")
+        with open(path, "w") as stream:
+            stream.write(json.dumps({"user": "reader", "author": "nobody"}))
+
+        with self.assertRaisesMessage(CommandError, "row 1: no user"):
+            self.import_("follow", path)
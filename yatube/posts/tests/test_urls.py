@@ -54,6 +54,9 @@ class PostUrlTests(TestCase):
             reverse(
                 "posts:profile", kwargs={"username": cls.user.username}
             ): "posts/profile.html",
+            reverse(
+                "posts:search"
+            ): "posts/search.html",
         }
 
         cls.authorized_client = Client()
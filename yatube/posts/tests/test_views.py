@@ -1,13 +1,22 @@
+import hashlib
 import shutil
 import tempfile
+from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Comment, Follow, Group, Post, User
+from django.utils.http import http_date
+from core.paginator import UnsupportedOperation
+from jobs.queue import run_next
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
 
 from ..forms import PostForm
 
@@ -37,6 +46,9 @@ class PaginatorViewsTest(TestCase):
             ) for i in range(15, 0, -1)]
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator(self):
         urls = (
             reverse(
@@ -53,15 +65,45 @@ class PaginatorViewsTest(TestCase):
         )
         for url in urls:
             with self.subTest(url=url):
-                for page in (1, 2):
-                    response = self.client.get(f"{url}?page={page}")
-                    page_obj = response.context.get("page_obj")
-
-                    self.assertEqual(
-                        len(page_obj),
-                        settings.POSTS_PER_PAGE if page == 1 else
-                        Post.objects.count() - settings.POSTS_PER_PAGE
-                    )
+                first_page = self.client.get(url).context.get("page_obj")
+                second_page = self.client.get(
+                    url, {"cursor": first_page.next_cursor}
+                ).context.get("page_obj")
+
+                self.assertEqual(len(first_page), settings.POSTS_PER_PAGE)
+                self.assertEqual(
+                    len(second_page),
+                    Post.objects.count() - settings.POSTS_PER_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+
+    def test_paginator_cursors(self):
+        url = reverse("posts:index")
+        posts = list(Post.objects.order_by("-pub_date", "-id"))
+
+        first_page = self.client.get(url).context.get("page_obj")
+        last_page = self.client.get(
+            url, {"cursor": first_page.last_cursor}
+        ).context.get("page_obj")
+        previous_page = self.client.get(
+            url, {"cursor": last_page.previous_cursor}
+        ).context.get("page_obj")
+        invalid_page = self.client.get(
+            url, {"cursor": "not-a-cursor"}
+        ).context.get("page_obj")
+
+        self.assertEqual(list(last_page), posts[-settings.POSTS_PER_PAGE:])
+        self.assertFalse(last_page.has_next())
+        self.assertEqual(
+            list(previous_page),
+            posts[:len(posts) - settings.POSTS_PER_PAGE]
+        )
+        self.assertFalse(previous_page.has_previous())
+        self.assertEqual(list(invalid_page), list(first_page))
+        # Counting would scan the rows the keyset seek skips.
+        with self.assertRaises(UnsupportedOperation):
+            first_page.paginator.count
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -94,6 +136,8 @@ class PostsViewsTest(TestCase):
             content_type="image/gif",
             name="small.gif"
         )
+        digest = hashlib.sha256(cls.small_gif).hexdigest()
+        cls.image_name = f"posts/{digest[:2]}/{digest}.gif"
 
         cls.user = User.objects.create_user(
             username="TestUser"
@@ -136,16 +180,72 @@ class PostsViewsTest(TestCase):
     def test_cache(self):
         url = reverse("posts:index")
 
-        instance = self.post = Post.objects.create(
+        self.client.get(url)
+        response = self.authorized_client.get(url)
+
+        self.assertIsNone(response.context.get("page_obj"))
+        self.assertContains(response, self.test_post.text)
+        self.assertContains(response, self.user.username)
+
+    def test_cache_invalidated_on_change(self):
+        url = reverse("posts:index")
+
+        instance = Post.objects.create(
             author=self.user,
             text="doesnt matter"
         )
-        old_content = self.authorized_client.get(url).content
+        self.assertContains(self.authorized_client.get(url), instance.text)
+
         instance.delete()
+        self.assertNotContains(
+            self.authorized_client.get(url),
+            instance.text
+        )
+
+        self.group.title = "Новое название"
+        self.group.save()
+        self.assertContains(self.authorized_client.get(url), self.group.title)
+
+    def test_post_cards_cached_by_version(self):
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
 
-        new_content = self.authorized_client.get(url).content
+        with mock.patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many:
+            self.authorized_client.get(url)
+        get_many.assert_called_once()
 
-        self.assertEqual(old_content, new_content)
+        cached_response = self.authorized_client.get(url)
+        self.test_post.text = "edited text"
+        self.test_post.save()
+        edited_response = self.authorized_client.get(url)
+
+        self.assertContains(cached_response, "test test")
+        self.assertContains(edited_response, "edited text")
+
+    def test_post_cards_expired_by_group_deletion(self):
+        group = Group.objects.create(slug="deleted", title="Удаляемая")
+        Post.objects.create(author=self.user, group=group, text="Пост")
+        group_url = reverse("posts:group_list", kwargs={"slug": group.slug})
+        url = reverse("posts:index")
+
+        self.assertContains(self.authorized_client.get(url), group_url)
+        group.delete()
+
+        self.assertNotContains(self.authorized_client.get(url), group_url)
+
+    def test_post_version_bump_not_lost_by_stale_save(self):
+        stale = Post.objects.get(pk=self.test_post.pk)
+        version = stale.version
+        Post.objects.filter(pk=stale.pk).update(version=F("version") + 1)
+
+        stale.text = "edited text"
+        stale.save()
+
+        self.assertEqual(stale.version, version + 2)
+        self.assertEqual(
+            Post.objects.get(pk=stale.pk).version, stale.version
+        )
 
     def test_comment_at_post_detail(self):
         response = self.authorized_client.get(
@@ -156,6 +256,43 @@ class PostsViewsTest(TestCase):
 
         self.assertEqual(comment_obj, self.comment)
 
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_comments_paginated(self):
+        comments = [self.comment] + [
+            Comment.objects.create(
+                author=self.random_user,
+                post=self.test_post,
+                text=f"comment {number}"
+            )
+            for number in range(3)
+        ]
+        comments.reverse()
+
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.test_post.id})
+        )
+        first_page = response.context.get("post_comments")
+        fragment = self.client.get(
+            reverse(
+                "posts:post_comments", kwargs={"post_id": self.test_post.id}
+            ),
+            {"cursor": first_page.next_cursor}
+        )
+        second_page = fragment.context.get("post_comments")
+
+        self.assertEqual(list(first_page), comments[:2])
+        self.assertContains(response, first_page.next_cursor)
+        self.assertTemplateUsed(fragment, "includes/comments.html")
+        self.assertEqual(list(second_page), comments[2:])
+        self.assertFalse(second_page.has_next())
+
+    def test_comments_of_missing_post_not_found(self):
+        response = self.client.get(
+            reverse("posts:post_comments", kwargs={"post_id": 0})
+        )
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
     def test_group_posts_use_correct_context(self):
         response = self.authorized_client.get(
             reverse(
@@ -170,7 +307,7 @@ class PostsViewsTest(TestCase):
         )
         self.assertEqual(
             response.context.get("page_obj")[0].image,
-            "posts/small.gif"
+            self.image_name
         )
 
         self.check_page_obj_at_context(response)
@@ -180,7 +317,7 @@ class PostsViewsTest(TestCase):
 
         self.assertEqual(
             response.context.get("page_obj")[0].image,
-            "posts/small.gif"
+            self.image_name
         )
 
         self.check_page_obj_at_context(response)
@@ -244,7 +381,7 @@ class PostsViewsTest(TestCase):
         )
         self.assertEqual(
             response.context.get("post").image,
-            "posts/small.gif"
+            self.image_name
         )
         self.assertEqual(
             posts_count,
@@ -290,7 +427,7 @@ class PostsViewsTest(TestCase):
         )
         self.assertEqual(
             response.context.get("page_obj")[0].image,
-            "posts/small.gif"
+            self.image_name
         )
 
         self.check_page_obj_at_context(response)
@@ -401,3 +538,224 @@ class TestSubscriptions(TestCase):
             ).exists(),
             False
         )
+
+    def test_follow_button_shows_follow_state(self):
+        follower_user = User.objects.create_user(username="username 5")
+        self.client.force_login(follower_user)
+        profile_url = reverse(
+            "posts:profile", kwargs={"username": self.author_user.username}
+        )
+        follow_url = reverse(
+            "posts:profile_follow",
+            kwargs={"username": self.author_user.username}
+        )
+        unfollow_url = reverse(
+            "posts:profile_unfollow",
+            kwargs={"username": self.author_user.username}
+        )
+
+        self.assertContains(self.client.get(profile_url), follow_url)
+        self.client.get(follow_url)
+        self.assertContains(self.client.get(profile_url), unfollow_url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(profile_url)
+        self.client.get(unfollow_url)
+        self.assertContains(self.client.get(profile_url), follow_url)
+
+        self.assertFalse(any(
+            '"posts_follow"' in query["sql"] for query in queries
+        ))
+
+    def test_unfollow_not_followed_author(self):
+        self.client.force_login(self.author_user)
+        url = reverse(
+            "posts:profile_unfollow",
+            kwargs={"username": self.author_user.username}
+        )
+
+        response = self.client.get(url)
+
+        self.assertRedirects(
+            response,
+            reverse(
+                "posts:profile",
+                kwargs={"username": self.author_user.username}
+            )
+        )
+
+    def test_follow_feed_materialized_on_write(self):
+        follower_user = User.objects.create_user(username="username 4")
+        self.client.force_login(follower_user)
+        url = reverse("posts:follow_index")
+
+        self.client.get(
+            reverse(
+                "posts:profile_follow",
+                kwargs={"username": self.author_user.username}
+            )
+        )
+        new_post = Post.objects.create(author=self.author_user, text="new")
+
+        self.assertEqual(
+            list(self.client.get(url).context.get("page_obj")),
+            [new_post, self.post]
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follower_user).count(), 2
+        )
+
+        self.client.get(
+            reverse(
+                "posts:profile_unfollow",
+                kwargs={"username": self.author_user.username}
+            )
+        )
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=follower_user).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_follow_feed_materialized_when_author_stops_being_pulled(self):
+        follower_user = User.objects.create_user(username="username 7")
+        leaving_user = User.objects.create_user(username="username 8")
+        Follow.objects.create(author=self.author_user, user=follower_user)
+        Follow.objects.create(author=self.author_user, user=leaving_user)
+        new_post = Post.objects.create(author=self.author_user, text="new")
+        Follow.objects.filter(
+            author=self.author_user, user=leaving_user
+        ).delete()
+
+        job = run_next(worker="test")
+        self.client.force_login(follower_user)
+        response = self.client.get(reverse("posts:follow_index"))
+
+        self.assertEqual(job.name, "posts.timeline.materialize")
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follower_user).count(), 2
+        )
+        self.assertEqual(
+            list(response.context.get("page_obj")),
+            [new_post, self.post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_feed_pulls_popular_authors(self):
+        follower_user = User.objects.create_user(username="username 5")
+        other_author = User.objects.create_user(username="username 6")
+        other_post = Post.objects.create(author=other_author, text="other")
+        Follow.objects.create(author=self.author_user, user=follower_user)
+        new_post = Post.objects.create(author=self.author_user, text="new")
+        self.client.force_login(follower_user)
+
+        response = self.client.get(reverse("posts:follow_index"))
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=follower_user).exists()
+        )
+        self.assertEqual(
+            list(response.context.get("page_obj")),
+            [new_post, self.post]
+        )
+        self.assertNotIn(other_post, response.context.get("page_obj"))
+
+
+class ConditionalViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            description="Описание",
+            slug="group",
+            title="Группа"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Пост"
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": cls.author}),
+            reverse("posts:post_detail", kwargs={"post_id": cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_unchanged_pages_not_modified(self):
+        for url in self.urls:
+            for client in (self.client, self.reader_client):
+                with self.subTest(url=url, client=client):
+                    # The first page with a form sets the CSRF cookie.
+                    client.get(url)
+                    etag = client.get(url)["ETag"]
+
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                    self.assertEqual(response.status_code, 304)
+
+    def test_anonymous_pages_cached_publicly(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+                self.assertLessEqual(len(queries), 1)
+
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn(
+                    f"max-age={settings.FEED_MAX_AGE}",
+                    response["Cache-Control"]
+                )
+                self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_edited_post_not_dated_unmodified(self):
+        since = http_date()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Исправленный пост"
+        post.save()
+
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, "Исправленный пост")
+
+    def test_user_pages_cached_privately(self):
+        response = self.reader_client.get(self.urls[0])
+
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotEqual(
+            response["ETag"], self.client.get(self.urls[0])["ETag"]
+        )
+
+    def test_changed_pages_rendered_again(self):
+        profile_url, detail_url = self.urls[2:]
+        changes = (
+            (profile_url, lambda: Follow.objects.create(
+                author=self.author, user=self.reader
+            )),
+            (detail_url, lambda: Comment.objects.create(
+                author=self.reader, post=self.post, text="Комментарий"
+            )),
+            (self.urls[1], lambda: Group.objects.filter(
+                pk=self.group.pk
+            ).first().save()),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)["ETag"]
+                change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+
+                self.assertEqual(response.status_code, 200)
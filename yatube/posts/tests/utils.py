@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    return context.captured_queries
+
+
+def assert_constant_queries(testcase, client, url, add_objects):
+    """Assert that rendering the url runs as many SQL queries after
+    add_objects() has added rows to the page as it did before."""
+    before = count_queries(client, url)
+    add_objects()
+    after = count_queries(client, url)
+
+    testcase.assertEqual(
+        len(before),
+        len(after),
+        "\n".join(query["sql"] for query in after)
+    )
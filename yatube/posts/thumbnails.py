@@ -0,0 +1,104 @@
+"""Post images processed off the request path.
+
+When a post gets a new image, a job of the run_jobs worker re-encodes
+it without metadata and renders its thumbnail into Post.thumbnail.
+Both are remembered for the uploaded file, so another upload of the
+same content reuses them without decoding it again.
+Until then templates show a placeholder, so neither uploading nor
+rendering a feed decodes images in the request.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from jobs.queue import task
+from PIL import Image, ImageOps
+
+from .blobs import change_references, get_derived, set_derived
+from .cache import bump_version
+from .models import Blob, Post
+
+
+def render_thumbnail(image_file):
+    """Crop the image to POST_THUMBNAIL_SIZE around the center, scaling
+    it up when it is smaller, and return it as JPEG content."""
+    with Image.open(image_file) as image:
+        thumbnail = ImageOps.fit(
+            image.convert("RGB"),
+            settings.POST_THUMBNAIL_SIZE,
+            Image.LANCZOS
+        )
+    buffer = BytesIO()
+    thumbnail.save(buffer, "JPEG", quality=85, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def strip_metadata(image_file):
+    """Return the image re-encoded in its format without EXIF and other
+    metadata and rotated upright, or None for animated images."""
+    with Image.open(image_file) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            return None
+        image_format = image.format
+        upright = ImageOps.exif_transpose(image)
+    upright.info.pop("exif", None)
+    upright.info.pop("XML:com.adobe.xmp", None)
+    buffer = BytesIO()
+    upright.save(buffer, image_format, quality=90)
+    return ContentFile(buffer.getvalue())
+
+
+@task
+def generate_thumbnail(post_id):
+    post = Post.objects.filter(pk=post_id).only("image", "thumbnail").first()
+    if post is None or not post.image:
+        return
+
+    uploaded_name = post.image.name
+    old_thumbnail_name = post.thumbnail.name
+    image_name, thumbnail_name = get_derived(uploaded_name)
+    if thumbnail_name is None:
+        with post.image.open() as image_file:
+            stripped = strip_metadata(image_file)
+            image_file.seek(0)
+            content = render_thumbnail(image_file)
+
+        name = os.path.basename(uploaded_name)
+        if stripped is not None:
+            post.image.save(name, stripped, save=False)
+            set_derived(uploaded_name, Blob.IMAGE, post.image.name)
+        post.thumbnail.save(
+            f"{os.path.splitext(name)[0]}.jpg", content, save=False
+        )
+        set_derived(uploaded_name, Blob.THUMBNAIL, post.thumbnail.name)
+        image_name, thumbnail_name = post.image.name, post.thumbnail.name
+    image_name = image_name or uploaded_name
+
+    # Files left unused when the post changed meanwhile are deleted
+    # by clean_images.
+    with transaction.atomic():
+        updated = Post.objects.filter(
+            pk=post_id,
+            image=uploaded_name,
+            thumbnail=old_thumbnail_name
+        ).update(
+            image=image_name,
+            thumbnail=thumbnail_name,
+            version=F("version") + 1
+        )
+        if not updated:
+            return
+        change_references((image_name, thumbnail_name), 1)
+        change_references((uploaded_name, old_thumbnail_name), -1)
+    bump_version("feed")
+
+
+def schedule_thumbnail(post):
+    """Queue the generation of the thumbnail of the post's image, once
+    for every uploaded image"""
+    generate_thumbnail.enqueue(
+        post.pk, key=f"thumbnail:{post.pk}:{post.image.name}"
+    )
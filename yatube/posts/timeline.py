@@ -0,0 +1,146 @@
+"""Materialized follow feeds.
+
+New posts are written to the TimelineEntry rows of every follower
+(fan-out on write), so follow_index reads an ordered list of post ids
+instead of joining posts through Follow. Authors followed by more than
+TIMELINE_FANOUT_LIMIT users are not fanned out, their posts are pulled
+and merged into the feed on read. When an unfollow brings an author
+back to the limit, materialize writes the posts of the pulled period
+to the feeds of their followers.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from core.paginator import NEXT, KeysetPaginator
+from jobs.queue import task
+
+from .models import Follow, Post, TimelineEntry, UserCounter
+
+BATCH_SIZE = 1000
+
+
+def is_pulled(author_id):
+    return UserCounter.objects.filter(
+        pk=author_id,
+        followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def get_pulled_author_ids(user):
+    """Return ids of the followed authors whose posts are pulled on read"""
+    return list(UserCounter.objects.filter(
+        followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+        user__following__user=user
+    ).values_list("pk", flat=True))
+
+
+def fan_out(post):
+    if is_pulled(post.author_id):
+        return
+
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list("user_id", flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                author_id=post.author_id,
+                post_id=post.pk,
+                pub_date=post.pub_date,
+                user_id=user_id
+            )
+            for user_id in follower_ids.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    if is_pulled(author_id):
+        return
+
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by().values_list("pk", "pub_date")
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                author_id=author_id,
+                post_id=post_id,
+                pub_date=pub_date,
+                user_id=user_id
+            )
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(author_id=author_id, user_id=user_id).delete()
+
+
+@task(priority=10)
+def materialize(author_id):
+    """Backfill the feeds of all followers of an author who is no longer
+    pulled, they miss the posts written and follows made meanwhile"""
+    if is_pulled(author_id):
+        return
+
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list("user_id", flat=True)
+    for user_id in follower_ids.iterator():
+        backfill(user_id, author_id)
+
+
+def unfollowed(author_id):
+    """Queue materialize when an unfollow brought the author from pulled
+    back to fanned out. Until the worker runs it, the feeds of their
+    followers lack the posts of the pulled period."""
+    if UserCounter.objects.filter(
+        pk=author_id,
+        followers=settings.TIMELINE_FANOUT_LIMIT
+    ).exists():
+        materialize.enqueue(author_id)
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Keyset paginator over the materialized feed of a user merged with
+    the posts of pulled authors."""
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page)
+        self.user = user
+        self.pulled_author_ids = get_pulled_author_ids(user)
+
+    def fetch(self, direction, key, limit):
+        entries = TimelineEntry.objects.filter(
+            user=self.user
+        ).exclude(author_id__in=self.pulled_author_ids)
+        keys = self.slice(
+            entries, direction, key, limit, keys=("pub_date", "post_id")
+        ).values_list("pub_date", "post_id")
+
+        if self.pulled_author_ids:
+            pulled = self.slice(
+                Post.objects.filter(author_id__in=self.pulled_author_ids),
+                direction,
+                key,
+                limit
+            ).values_list("pub_date", "id")
+            keys = heapq.merge(keys, pulled, reverse=direction == NEXT)
+
+        post_ids = [post_id for _, post_id in islice(keys, limit)]
+        posts = self.object_list.in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+def get_timeline_page(request, posts_list, per_page=settings.POSTS_PER_PAGE):
+    paginator = TimelinePaginator(posts_list, per_page, request.user)
+    cursor = request.GET.get("cursor")
+
+    return paginator.get_page(cursor)
@@ -0,0 +1,206 @@
+"""Streaming import and export of groups, posts, comments and follows,
+see the import_posts and export_posts commands.
+
+Rows are plain dicts, written and read one at a time as NDJSON or CSV,
+so memory use does not depend on the size of the file. Users are
+referred to by username and groups by slug, posts and comments keep
+their ids, so comments can be imported after the posts they belong to.
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from .graph import GRAPH_SCOPE
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+
+
+class Transfer:
+    """Columns of a model and how they map to its fields.
+
+    columns maps a column to the lookup it is exported from. Columns
+    listed in references hold a natural key of another model and are
+    stored in the foreign key of the same name. After an import the
+    rebuilds commands run and the cache versions of scopes are bumped.
+    """
+    model = None
+    columns = {}
+    references = {}
+    rebuilds = ()
+    scopes = ("feed",)
+
+    def export_rows(self):
+        lookups = list(self.columns.values())
+        rows = self.model.objects.order_by("pk").values_list(*lookups)
+        for values in rows.iterator(chunk_size=BATCH_SIZE):
+            yield dict(zip(self.columns, values))
+
+    def resolve(self, rows):
+        """Return the primary keys of the natural keys used by rows"""
+        resolved = {}
+        for column, (model, field) in self.references.items():
+            keys = {row[column] for row in rows if row.get(column)}
+            resolved[column] = {
+                str(key): pk for key, pk in model.objects.filter(
+                    **{f"{field}__in": keys}
+                ).values_list(field, "pk")
+            }
+        return resolved
+
+    def build(self, rows, first_row):
+        """Return unsaved model instances of rows, numbered from
+        first_row in error messages"""
+        resolved = self.resolve(rows)
+        objects = []
+        for number, row in enumerate(rows, first_row):
+            values = {}
+            for column in self.columns:
+                value = row.get(column)
+                if value in ("", None):
+                    value = None
+                if column in self.references:
+                    if value is not None:
+                        key = resolved[column].get(str(value))
+                        if key is None:
+                            model, field = self.references[column]
+                            raise ValueError(
+                                f"row {number}: no {model._meta.model_name} "
+                                f"with {field} {value!r}"
+                            )
+                        value = key
+                    values[f"{column}_id"] = value
+                elif value is not None:
+                    field = self.model._meta.get_field(column)
+                    values[field.attname] = field.to_python(value)
+            objects.append(self.model(**values))
+        return objects
+
+
+class GroupTransfer(Transfer):
+    model = Group
+    columns = {
+        "id": "id",
+        "slug": "slug",
+        "title": "title",
+        "description": "description",
+    }
+
+
+class PostTransfer(Transfer):
+    model = Post
+    columns = {
+        "id": "id",
+        "author": "author__username",
+        "group": "group__slug",
+        "pub_date": "pub_date",
+        "text": "text",
+        "image": "image",
+    }
+    references = {
+        "author": (User, "username"),
+        "group": (Group, "slug"),
+    }
+    rebuilds = (
+        "rebuild_counters", "rebuild_timelines", "rebuild_search_index",
+    )
+
+
+class CommentTransfer(Transfer):
+    model = Comment
+    columns = {
+        "id": "id",
+        "post": "post_id",
+        "author": "author__username",
+        "pub_date": "pub_date",
+        "text": "text",
+    }
+    references = {
+        "author": (User, "username"),
+        "post": (Post, "pk"),
+    }
+    rebuilds = ("rebuild_search_index",)
+
+
+class FollowTransfer(Transfer):
+    model = Follow
+    columns = {
+        "user": "user__username",
+        "author": "author__username",
+    }
+    references = {
+        "user": (User, "username"),
+        "author": (User, "username"),
+    }
+    rebuilds = ("rebuild_counters", "rebuild_timelines")
+    scopes = ("feed", GRAPH_SCOPE)
+
+
+TRANSFERS = {
+    "group": GroupTransfer(),
+    "post": PostTransfer(),
+    "comment": CommentTransfer(),
+    "follow": FollowTransfer(),
+}
+
+
+def encode(value):
+    # DjangoJSONEncoder would cut the microseconds of the dates.
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def write_ndjson(rows, columns, stream):
+    for row in rows:
+        stream.write(
+            json.dumps(row, default=encode, ensure_ascii=False) + "\n"
+        )
+
+
+def read_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_csv(rows, columns, stream):
+    writer = csv.DictWriter(stream, columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(
+            {column: encode(value) for column, value in row.items()}
+        )
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+FORMATS = {
+    "csv": (write_csv, read_csv),
+    "ndjson": (write_ndjson, read_ndjson),
+}
+
+
+def get_format(path):
+    """Guess the format of a file from its extension"""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+@contextmanager
+def keep_pub_date(model):
+    """Insert the imported publication dates instead of the current time
+    auto_now_add would set, bulk_create calls pre_save too"""
+    field = next(
+        (field for field in model._meta.fields if field.name == "pub_date"),
+        None
+    )
+    if field is None:
+        yield
+        return
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
@@ -20,6 +20,11 @@ urlpatterns = [
         views.follow_index,
         name="follow_index"
     ),
+    path(
+        "follow/suggestions/",
+        views.follow_suggestions,
+        name="follow_suggestions"
+    ),
     path(
         "group/<slug:slug>/",
         views.group_posts,
@@ -35,6 +40,11 @@ urlpatterns = [
         views.add_comment,
         name="add_comment"
     ),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments"
+    ),
     path(
         "posts/<int:post_id>/edit/",
         views.post_edit,
@@ -50,9 +60,24 @@ urlpatterns = [
         views.profile_follow,
         name="profile_follow"
     ),
+    path(
+        "profile/<str:username>/followers/",
+        views.profile_followers,
+        name="profile_followers"
+    ),
+    path(
+        "profile/<str:username>/following/",
+        views.profile_following,
+        name="profile_following"
+    ),
     path(
         "profile/<str:username>/unfollow/",
         views.profile_unfollow,
         name="profile_unfollow"
     ),
+    path(
+        "search/",
+        views.search,
+        name="search"
+    ),
 ]
@@ -1,9 +1,25 @@
-from django.core.paginator import Paginator
 from django.conf import settings
+from core.paginator import IdsPaginator, KeysetPaginator
+
+from .models import User
 
 
 def get_page_obj(request, posts_list, per_page=settings.POSTS_PER_PAGE):
-    paginator = Paginator(posts_list, per_page)
-    page_number = request.GET.get("page")
+    paginator = KeysetPaginator(posts_list, per_page)
+    cursor = request.GET.get("cursor")
+
+    return paginator.get_page(cursor)
+
+
+def get_users_page(request, user_ids, per_page=None):
+    """Paginate ascending user ids, like the arrays of posts.graph, and
+    load the users of the page"""
+    paginator = IdsPaginator(user_ids, per_page or settings.USERS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
-    return paginator.get_page(page_number)
+    users = User.objects.in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        users[user_id] for user_id in page_obj.object_list
+        if user_id in users
+    ]
+    return page_obj
@@ -1,13 +1,23 @@
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie
+from core.cache import get_or_build
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse
 
-from .forms import CommentForm, PostForm
+from .cache import make_key
+from .conditions import (
+    conditional_page, group_state, index_state, post_state, profile_state
+)
+from .counters import get_group_counter, get_user_counter
+from .forms import CommentForm, PostForm, SearchForm
+from .graph import get_followers, get_following, get_mutual, suggest
 from .models import Comment, Follow, Group, Post, User
-from .utils import get_page_obj
+from .search import get_search_page
+from .thumbnails import schedule_thumbnail
+from .timeline import get_timeline_page
+from .utils import get_page_obj, get_users_page
 
 
 @login_required
@@ -26,61 +36,94 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_obj(request, posts)
+    page_obj = get_timeline_page(request, Post.objects.for_feed())
 
     return render(request, "posts/follow.html", {'page_obj': page_obj})
 
 
+@login_required
+def follow_suggestions(request):
+    suggestions = suggest(request.user.pk, settings.FOLLOW_SUGGESTIONS)
+    users = User.objects.in_bulk([user_id for user_id, _ in suggestions])
+
+    context = {
+        "suggestions": [
+            (users[user_id], overlap)
+            for user_id, overlap in suggestions
+            if user_id in users
+        ],
+    }
+    return render(request, "posts/suggestions.html", context)
+
+
+@conditional_page(group_state)
 def group_posts(request, slug):
     template = "posts/group_list.html"
 
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
+    posts_list = group.posts.for_feed()
     page_obj = get_page_obj(request, posts_list)
 
     context = {
+        "counter": get_group_counter(group),
         "group": group,
         "page_obj": page_obj,
     }
     return render(request, template, context)
 
 
-@cache_page(timeout=settings.CACHE_TIME, key_prefix="index_page")
-@vary_on_cookie
+@conditional_page(index_state)
 def index(request):
     template = "posts/index.html"
 
-    posts_list = Post.objects.all()
-    page_obj = get_page_obj(request, posts_list)
+    context = {}
 
-    context = {
-        "page_obj": page_obj,
-    }
+    def render_feed():
+        posts_list = Post.objects.for_feed()
+        context["page_obj"] = get_page_obj(request, posts_list)
+        return render_to_string("includes/feed.html", context, request)
+
+    context["feed"] = get_or_build(
+        make_key("feed", "index", request.GET.urlencode()),
+        render_feed,
+        settings.CACHE_TIME
+    )
     return render(request, template, context)
 
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None, files=request.FILES or None)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        upload_errors=getattr(request, "upload_errors", None)
+    )
 
     if not form.is_valid():
         return render(request, "posts/create_post.html", {"form": form})
 
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
+        if post.image:
+            schedule_thumbnail(post)
     return redirect("posts:profile", username=request.user)
 
 
+@conditional_page(post_state)
 def post_detail(request, post_id):
     template = "posts/post_detail.html"
 
     form = CommentForm()
 
-    post = get_object_or_404(Post, pk=post_id)
-    post_comments = Comment.objects.filter(post__id=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    post_comments = get_page_obj(
+        request,
+        Comment.objects.for_feed().filter(post_id=post_id),
+        settings.COMMENTS_PER_PAGE
+    )
+    posts_count = get_user_counter(post.author).posts
 
     context = {
         "form": form,
@@ -91,6 +134,25 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Render a page of comments as a fragment that post_detail loads
+    when the reader asks for more"""
+    template = "includes/comments.html"
+    get_object_or_404(Post.objects.only("id"), id=post_id)
+
+    post_comments = get_page_obj(
+        request,
+        Comment.objects.for_feed().filter(post_id=post_id),
+        settings.COMMENTS_PER_PAGE
+    )
+
+    context = {
+        "post_comments": post_comments,
+        "post_id": post_id,
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -100,7 +162,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=getattr(request, "upload_errors", None)
     )
 
     if not form.is_valid():
@@ -111,10 +174,14 @@ def post_edit(request, post_id):
         }
         return render(request, "posts/create_post.html", context)
 
-    form.save()
+    with transaction.atomic():
+        post = form.save()
+        if post.image and "image" in form.changed_data:
+            schedule_thumbnail(post)
     return redirect("posts:post_detail", post_id=post_id)
 
 
+@conditional_page(profile_state)
 def profile(request, username):
     template = "posts/profile.html"
 
@@ -122,14 +189,10 @@ def profile(request, username):
         User,
         username=username
     )
-    page_obj = get_page_obj(request, author.posts.all())
-    following = Follow.objects.filter(
-        author__id=author.id,
-        user__id=request.user.id
-    ).exists()
+    page_obj = get_page_obj(request, author.posts.for_feed())
 
     context = {
-        "following": following,
+        "counter": get_user_counter(author),
         "page_obj": page_obj,
         "author": author,
     }
@@ -140,14 +203,63 @@ def profile(request, username):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(author=author, user=request.user)
+        with transaction.atomic():
+            Follow.objects.get_or_create(author=author, user=request.user)
 
     return redirect(reverse("posts:profile", kwargs={"username": username}))
 
 
+def profile_followers(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = get_users_page(request, get_followers(author.pk))
+
+    context = {
+        "author": author,
+        "mutual_ids": get_mutual(
+            author.pk, [person.pk for person in page_obj]
+        ),
+        "page_obj": page_obj,
+        "title": "Подписчики",
+    }
+    return render(request, "posts/follow_list.html", context)
+
+
+def profile_following(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = get_users_page(request, get_following(author.pk))
+
+    context = {
+        "author": author,
+        "mutual_ids": get_mutual(
+            author.pk, [person.pk for person in page_obj]
+        ),
+        "page_obj": page_obj,
+        "title": "Подписки",
+    }
+    return render(request, "posts/follow_list.html", context)
+
+
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(author=author, user=request.user).delete()
+    with transaction.atomic():
+        Follow.objects.filter(author=author, user=request.user).delete()
 
     return redirect(reverse("posts:profile", kwargs={"username": username}))
+
+
+def search(request):
+    template = "posts/search.html"
+
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        page_obj = get_search_page(
+            request, form.cleaned_data["q"], form.get_filters()
+        )
+
+    context = {
+        "form": form,
+        "page_obj": page_obj,
+    }
+    return render(request, template, context)
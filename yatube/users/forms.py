@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+
+from .tasks import send_password_reset
 
 User = get_user_model()
 
@@ -9,3 +11,23 @@ class CreationForm(UserCreationForm):
         fields = ("email", "first_name", "last_name", "username")
 
         model = User
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        """Send the email from a job, which only gets the user id and the
+        public parts of the context and makes the token itself"""
+        send_password_reset.enqueue(
+            context["user"].pk,
+            to_email,
+            {
+                name: context[name]
+                for name in ("domain", "protocol", "site_name")
+            },
+            from_email,
+            subject_template_name,
+            email_template_name,
+            html_email_template_name=html_email_template_name
+        )
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from jobs.queue import task
+
+User = get_user_model()
+
+
+@task(priority=10)
+def send_email(subject, body, from_email, recipients, html_message=None):
+    mail.send_mail(
+        subject,
+        body,
+        from_email,
+        recipients,
+        html_message=html_message
+    )
+
+
+@task(priority=10)
+def send_password_reset(user_id, to_email, context, from_email,
+                        subject_template_name, email_template_name,
+                        html_email_template_name=None):
+    """Render and send the password reset email of the user. The token
+    is made here, so the reset link is never stored in the job."""
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return
+    context = dict(
+        context,
+        email=to_email,
+        token=default_token_generator.make_token(user),
+        uid=urlsafe_base64_encode(force_bytes(user.pk)),
+        user=user,
+    )
+    subject = loader.render_to_string(subject_template_name, context)
+    html_message = None
+    if html_email_template_name is not None:
+        html_message = loader.render_to_string(
+            html_email_template_name, context
+        )
+    send_email(
+        "".join(subject.splitlines()),
+        loader.render_to_string(email_template_name, context),
+        from_email,
+        [to_email],
+        html_message=html_message
+    )
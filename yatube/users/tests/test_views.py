@@ -1,9 +1,12 @@
 from django import forms, utils
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
+from django.core import mail
 from django.forms import models
 from django.test import Client, TestCase
 from django.urls import reverse
+from jobs.models import Job
+from jobs.queue import run_next
 
 User = get_user_model()
 
@@ -56,6 +59,28 @@ class UsersViewsTest(TestCase):
 
         self.assertIsInstance(form_obj, models.ModelForm)
 
+    def test_password_reset_email_sent_by_job(self):
+        self.unauthorized_user.email = "user@example.com"
+        self.unauthorized_user.set_password("password")
+        self.unauthorized_user.save()
+
+        response = self.client.post(
+            reverse("users:password_reset"),
+            {"email": "user@example.com"}
+        )
+        sent_in_request = len(mail.outbox)
+        queued_payload = Job.objects.get().payload
+        job = run_next(worker="test")
+        token = default_token_generator.make_token(self.unauthorized_user)
+
+        self.assertRedirects(response, reverse("users:password_reset_done"))
+        self.assertEqual(sent_in_request, 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user@example.com"])
+        self.assertIn(token, mail.outbox[0].body)
+        self.assertNotIn(token, queued_payload)
+        self.assertEqual(job.payload, "")
+
     def test_view_funcs_use_correct_template_authorized(self):
         for url, template in self.url_templates_authorized.items():
             with self.subTest(url=url):
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -32,22 +33,63 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
+CACHE_BACKENDS = {
+    "db": (
+        "django.core.cache.backends.db.DatabaseCache",
+        "cache_table",
+    ),
+    "file": (
+        "django.core.cache.backends.filebased.FileBasedCache",
+        os.path.join(tempfile.gettempdir(), "yatube_cache"),
+    ),
+    "locmem": (
+        "django.core.cache.backends.locmem.LocMemCache",
+        "",
+    ),
+    "memcached": (
+        "django.core.cache.backends.memcached.MemcachedCache",
+        "127.0.0.1:11211",
+    ),
+    "redis": (
+        "django_redis.cache.RedisCache",
+        "redis://127.0.0.1:6379/1",
+    ),
+}
+
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS.get(
+    os.getenv("CACHE_BACKEND", "file"),
+    (os.getenv("CACHE_BACKEND"), ""),
+)
+
 CACHES = {
     'default': {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", CACHE_LOCATION),
     },
 }
 
+# Only the backends culling entries themselves take MAX_ENTRIES, the
+# clients of memcached and redis reject unknown options.
+CULLED_CACHES = ("db", "file", "locmem")
+if CACHE_BACKEND in (CACHE_BACKENDS[name][0] for name in CULLED_CACHES):
+    CACHES["default"]["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+    }
+
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    "core.routers.ReplicaMiddleware",
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -57,13 +99,32 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "core.metrics": {
+            "handlers": ["console"],
+            "level": os.getenv("METRICS_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        "BACKEND": "core.metrics.TimedDjangoTemplates",
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,13 +141,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+DATABASE_REPLICAS = [
+    f"replica{number}"
+    for number in range(int(os.getenv("DATABASE_REPLICAS", 0)))
+]
+
+CONN_MAX_AGE = int(os.getenv("CONN_MAX_AGE", 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        # In memory the job workers' threads get "table is locked" at
+        # once, in a file they wait for busy_timeout like in production.
+        "TEST": {
+            "NAME": os.path.join(BASE_DIR, "test_db.sqlite3"),
+        },
+    },
+    **{
+        alias: {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(BASE_DIR, f"db.{alias}.sqlite3"),
+            "TEST": {
+                "MIRROR": "default",
+            },
+        }
+        for alias in DATABASE_REPLICAS
+    },
 }
 
+SQLITE_PRAGMAS = {
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+}
+
+DATABASE_ROUTERS = [
+    "core.routers.ReplicaRouter",
+]
+
+REPLICA_VIEWS = [
+    "posts:follow_index",
+    "posts:group_list",
+    "posts:index",
+    "posts:post_comments",
+    "posts:post_detail",
+    "posts:profile",
+    "posts:search",
+    "api:follow_index",
+    "api:group_list",
+    "api:index",
+    "api:post_comments",
+    "api:post_detail",
+    "api:profile",
+]
+
+REPLICA_PIN_TIME = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,6 +227,12 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+STATICFILES_STORAGE = "core.staticfiles.CompressedManifestStorage"
+
+STATIC_MAX_AGE = 60 * 60
+
 LOGIN_URL = "users:login"
 
 LOGIN_REDIRECT_URL = "posts:index"
@@ -124,12 +243,59 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 POSTS_PER_PAGE = 10
 
+COMMENTS_PER_PAGE = 20
+
+USERS_PER_PAGE = 20
+
+FOLLOW_SUGGESTIONS = 10
+
+GRAPH_SUGGESTION_SOURCES = 200
+
+TIMELINE_FANOUT_LIMIT = 1000
+
 FIFTEEN = 15
 
-CACHE_TIME = 20
+CACHE_TIME = 60 * 60 * 24
+
+FEED_MAX_AGE = int(os.getenv("FEED_MAX_AGE", 60))
+
+CACHE_LOCK_TIMEOUT = 10
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
 MEDIA_URL = "/media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+MEDIA_MAX_AGE = 60 * 60 * 24
+
+# "x-accel-redirect" behind nginx or "x-sendfile" behind Apache.
+MEDIA_ACCEL = os.getenv("MEDIA_ACCEL")
+
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+FILE_UPLOAD_HANDLERS = [
+    "core.uploadhandlers.LimitedUploadHandler",
+]
+
+MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+
+MAX_IMAGE_PIXELS = 4096 * 4096
+
+POST_THUMBNAIL_SIZE = (960, 339)
+
+IMAGE_CLEANUP_DELAY = 60 * 60
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+
+JOB_POLL_INTERVAL = 1
+
+JOB_MAX_ATTEMPTS = 3
+
+JOB_RETRY_DELAY = 10
+
+JOB_TIMEOUT = 10 * 60
+
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND")
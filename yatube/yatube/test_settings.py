@@ -0,0 +1,17 @@
+"""Settings of the test runs. Tests clear the cache, so they get one of
+their own instead of the cache the site is served from."""
+from .settings import *  # noqa: F401, F403
+from .settings import CACHE_BACKENDS
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS["locmem"][0],
+        "LOCATION": "tests",
+    },
+}
+
+# Pages are rendered without running collectstatic first, so there is
+# no manifest to link the hashed names from.
+STATICFILES_STORAGE = (
+    "django.contrib.staticfiles.storage.StaticFilesStorage"
+)
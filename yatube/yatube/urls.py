@@ -1,14 +1,20 @@
 from django.contrib import admin
 from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import include, path
 
+from core.views import media, metrics
+
 
 urlpatterns = [
     path("about/", include("about.urls", namespace="about")),
     path("admin/", admin.site.urls),
+    path("api/", include("api.urls", namespace="api")),
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
+    path(
+        f"{settings.MEDIA_URL.lstrip('/')}<path:path>", media, name="media"
+    ),
+    path("metrics/", metrics, name="metrics"),
     path("", include("posts.urls", namespace="posts")),
 ]
 
@@ -18,8 +24,4 @@ handler500 = "core.views.server_error"
 
 if settings.DEBUG:
     import debug_toolbar
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)